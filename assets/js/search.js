@@ -0,0 +1,169 @@
+/**
+ * Telar - Site search
+ *
+ * Queries the index written by scripts/generate_search_index.py. Only
+ * meta.json is loaded up front; the term shards matching each typed word
+ * and the document chunks of the results shown are fetched on demand and
+ * kept for later queries.
+ */
+
+const SEARCH_MAX_RESULTS = 20;
+const SEARCH_DELAY_MS = 150;
+
+// Same folding as the index: lowercase, accents removed
+const SEARCH_FOLD_LETTERS = { 'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ı': 'i' };
+
+const SEARCH_TYPE_LABELS = { object: 'Object', story: 'Story', glossary: 'Glossary' };
+
+document.addEventListener('DOMContentLoaded', function() {
+  const form = document.getElementById('search-form');
+  if (!form) return;
+
+  const input = document.getElementById('search-input');
+  const status = document.getElementById('search-status');
+  const results = document.getElementById('search-results');
+  const indexUrl = form.dataset.indexUrl.replace(/\/$/, '');
+
+  const cache = new Map();
+  let meta = null;
+  let latestQuery = 0;
+  let timer = null;
+
+  function fetchJson(path) {
+    if (!cache.has(path)) {
+      cache.set(path, fetch(`${indexUrl}/${path}`).then(response => {
+        if (!response.ok) throw new Error(`${response.status} ${path}`);
+        return response.json();
+      }));
+    }
+    return cache.get(path);
+  }
+
+  function fold(text) {
+    return text.toLowerCase().normalize('NFKD').replace(/\p{Mn}/gu, '')
+      .replace(/[ßæœøłđı]/g, letter => SEARCH_FOLD_LETTERS[letter]);
+  }
+
+  function queryWords(query) {
+    const stopwords = new Set(meta.stopwords);
+    const words = fold(query).match(/[a-z0-9]+/g) || [];
+    return [...new Set(words.filter(word => word.length > 1 && !stopwords.has(word)))];
+  }
+
+  /**
+   * Scores of the documents matching a word: terms equal to the word count
+   * in full, longer terms starting with it count half
+   */
+  async function wordScores(word) {
+    const prefixes = meta.shards.filter(prefix => prefix.startsWith(word) || word.startsWith(prefix));
+    const shards = await Promise.all(prefixes.map(prefix => fetchJson(`terms/${prefix}.json`)));
+    const scores = new Map();
+    shards.forEach(shard => {
+      Object.keys(shard).forEach(term => {
+        if (!term.startsWith(word)) return;
+        const postings = shard[term];
+        let doc = 0;
+        for (let i = 0; i < postings.length; i += 2) {
+          doc += postings[i];
+          const score = term === word ? postings[i + 1] : postings[i + 1] / 2;
+          scores.set(doc, Math.max(scores.get(doc) || 0, score));
+        }
+      });
+    });
+    return scores;
+  }
+
+  async function search(query) {
+    if (!meta) meta = await fetchJson('meta.json');
+    const words = queryWords(query);
+    if (!words.length) return { documents: [], total: 0 };
+
+    // Documents matching every word, by total score
+    const perWord = await Promise.all(words.map(wordScores));
+    const totals = new Map(perWord[0]);
+    perWord.slice(1).forEach(scores => {
+      totals.forEach((total, doc) => {
+        if (scores.has(doc)) {
+          totals.set(doc, total + scores.get(doc));
+        } else {
+          totals.delete(doc);
+        }
+      });
+    });
+
+    const ranked = [...totals.entries()].sort((a, b) => b[1] - a[1] || a[0] - b[0]);
+    const top = ranked.slice(0, SEARCH_MAX_RESULTS);
+    const chunks = await Promise.all(top.map(([doc]) => fetchJson(`docs/${Math.floor(doc / meta.docs_per_chunk)}.json`)));
+    const documents = top.map(([doc], i) => {
+      const [type, title, url, context] = chunks[i][doc % meta.docs_per_chunk];
+      return { type, title, url, context };
+    });
+    return { documents, total: ranked.length };
+  }
+
+  function render(query, found) {
+    results.innerHTML = '';
+    if (!found.documents.length) {
+      status.textContent = query.trim() ? 'No results.' : '';
+      return;
+    }
+
+    status.textContent = found.total > found.documents.length
+      ? `Showing ${found.documents.length} of ${found.total} results.`
+      : `${found.total} result${found.total === 1 ? '' : 's'}.`;
+
+    const siteUrl = form.dataset.siteUrl.replace(/\/$/, '');
+    found.documents.forEach(result => {
+      const item = document.createElement('li');
+      item.className = 'list-group-item';
+
+      const badge = document.createElement('span');
+      badge.className = 'badge bg-secondary me-2';
+      badge.textContent = SEARCH_TYPE_LABELS[result.type] || result.type;
+
+      const link = document.createElement('a');
+      link.href = `${siteUrl}${result.url}`;
+      link.textContent = result.title;
+
+      item.append(badge, link);
+      if (result.context) {
+        const context = document.createElement('div');
+        context.className = 'text-muted small';
+        context.textContent = result.context;
+        item.appendChild(context);
+      }
+      results.appendChild(item);
+    });
+  }
+
+  function run() {
+    const query = input.value;
+    const current = ++latestQuery;
+    search(query)
+      .then(found => {
+        if (current === latestQuery) render(query, found);
+      })
+      .catch(error => {
+        console.error('Search failed:', error);
+        if (current === latestQuery) status.textContent = 'Search is not available.';
+      });
+  }
+
+  input.addEventListener('input', function() {
+    clearTimeout(timer);
+    timer = setTimeout(run, SEARCH_DELAY_MS);
+  });
+
+  form.addEventListener('submit', function(e) {
+    e.preventDefault();
+    clearTimeout(timer);
+    run();
+  });
+
+  // Support links to /search/?q=...
+  const initialQuery = new URLSearchParams(window.location.search).get('q');
+  if (initialQuery) {
+    input.value = initialQuery;
+    run();
+  }
+});
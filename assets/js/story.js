@@ -18,6 +18,9 @@ let currentViewerCard = null; // Currently active viewer card
 let currentStepNumber = null; // Track current step to prevent duplicate processing
 let panelStack = [];
 let objectsIndex = {}; // Quick lookup for object data
+let viewerPlan = {}; // Plan entries by object ID: manifest, image service, dimensions
+let prefetchedObjects = new Set(); // Objects whose manifest and info.json were requested
+const PREFETCH_AHEAD = 4; // Steps ahead whose objects are prefetched
 let isPanelOpen = false; // Track if any panel is open
 let scrollLockActive = false; // Track if scroll-lock is active
 
@@ -29,6 +32,7 @@ const MAX_VIEWER_CARDS = 5;
 // Initialize when DOM is ready
 document.addEventListener('DOMContentLoaded', function() {
   buildObjectsIndex();
+  buildViewerPlan();
   initializeFirstViewer();
   initializeStepController();
   initializePanels();
@@ -45,6 +49,48 @@ function buildObjectsIndex() {
   });
 }
 
+/**
+ * Index the story's viewer plan, generated at build time
+ *
+ * Each entry gives an object's manifest URL and image service id, so the
+ * viewer doesn't have to look them up, and upcoming objects can be
+ * prefetched before their step is reached.
+ */
+function buildViewerPlan() {
+  const plan = window.storyData?.viewerPlan;
+  const objects = (plan && plan.objects) || [];
+  objects.forEach(entry => {
+    // Local objects are listed relative to the site's baseurl
+    viewerPlan[entry.object_id] = {
+      ...entry,
+      manifest: resolveSiteUrl(entry.manifest),
+      service: resolveSiteUrl(entry.service)
+    };
+  });
+}
+
+/**
+ * Request an object's manifest and info.json ahead of its viewer
+ *
+ * Both are requested in parallel rather than one after the other, and
+ * the viewer later finds them in the browser cache.
+ */
+function prefetchObject(objectId) {
+  const entry = viewerPlan[objectId];
+  if (!entry || prefetchedObjects.has(objectId)) return;
+  prefetchedObjects.add(objectId);
+
+  const urls = [entry.manifest];
+  if (entry.service) {
+    urls.push(`${entry.service.replace(/\/$/, '')}/info.json`);
+  }
+  urls.forEach(url => {
+    if (url) {
+      fetch(url).catch(error => console.warn('Prefetch failed:', url, error));
+    }
+  });
+}
+
 /**
  * Initialize first viewer card on page load
  */
@@ -57,6 +103,7 @@ function initializeFirstViewer() {
   }
 
   console.log('Initializing first viewer for object:', firstObjectId);
+  prefetchObject(firstObjectId);
 
   // Find the first step that has this object (skip intro and metadata)
   const steps = window.storyData?.steps || [];
@@ -252,6 +299,11 @@ function destroyViewerCard(viewerCard) {
  * Get manifest URL for an object
  */
 function getManifestUrl(objectId) {
+  // Resolved at build time when the story has a viewer plan
+  if (viewerPlan[objectId] && viewerPlan[objectId].manifest) {
+    return viewerPlan[objectId].manifest;
+  }
+
   const object = objectsIndex[objectId];
 
   if (!object) {
@@ -270,9 +322,12 @@ function getManifestUrl(objectId) {
 }
 
 /**
- * Build local IIIF manifest.json URL
+ * Resolve a site path (e.g. /iiif/objects/img01/manifest.json) against the
+ * page's own origin and baseurl; absolute URLs are returned unchanged
  */
-function buildLocalInfoJsonUrl(objectId) {
+function resolveSiteUrl(path) {
+  if (!path || !path.startsWith('/')) return path;
+
   // Get the site's base URL from the page
   // For /telar/stories/story-1/, we want /telar
   const pathParts = window.location.pathname.split('/').filter(p => p);
@@ -283,7 +338,14 @@ function buildLocalInfoJsonUrl(objectId) {
     basePath = '/' + pathParts.slice(0, -2).join('/');
   }
 
-  const manifestUrl = `${window.location.origin}${basePath}/iiif/objects/${objectId}/manifest.json`;
+  return `${window.location.origin}${basePath}${path}`;
+}
+
+/**
+ * Build local IIIF manifest.json URL
+ */
+function buildLocalInfoJsonUrl(objectId) {
+  const manifestUrl = resolveSiteUrl(`/iiif/objects/${objectId}/manifest.json`);
   console.log('Building local IIIF manifest URL:', manifestUrl);
 
   return manifestUrl;
@@ -495,6 +557,12 @@ function preloadUpcomingViewers(currentIndex) {
   const PRELOAD_AHEAD = 2; // Preload 2 steps forward
   const PRELOAD_BEHIND = 1; // Preload 1 step backward
 
+  // Fetch manifests and info.json a little further ahead than viewers are created
+  for (let i = 1; i <= PREFETCH_AHEAD && currentIndex + i < allSteps.length; i++) {
+    const objectId = allSteps[currentIndex + i].dataset.object;
+    if (objectId) prefetchObject(objectId);
+  }
+
   // Preload forward
   for (let i = 1; i <= PRELOAD_AHEAD; i++) {
     const nextIndex = currentIndex + i;
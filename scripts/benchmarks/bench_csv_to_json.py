@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark a full csv_to_json.py run on a large synthetic sheet
+
+Writes an objects table and a story table to a temporary project
+directory and runs csv_to_json.py on them in a fresh interpreter, so
+import time is included. Reports wall time and the peak memory (max RSS)
+of the run. No network requests are made: the objects have no manifests.
+
+Usage:
+    python scripts/benchmarks/bench_csv_to_json.py [--objects 20000] [--steps 5000] [--repeat 3]
+"""
+
+import argparse
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'csv_to_json.py'
+
+def build_project(objects, steps):
+    """Write the synthetic CSVs into the current directory"""
+    structures = Path('components/structures')
+    structures.mkdir(parents=True)
+    Path('components/images/objects').mkdir(parents=True)
+    Path('components/texts/stories').mkdir(parents=True)
+
+    with open(structures / 'project.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['order', 'title', 'subtitle'])
+        writer.writerow([1, 'Benchmark story', ''])
+
+    with open(structures / 'objects.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['object_id', 'title', 'description', 'creator', 'period', 'thumbnail', 'iiif_manifest'])
+        for i in range(objects):
+            writer.writerow([f"obj-{i:06d}", f"Object {i}", 'Synthetic benchmark object, ' * 4, 'Unknown', 1600 + i % 300, '', ''])
+
+    with open(structures / 'story-1.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['step', 'question', 'answer', 'object', 'x', 'y', 'zoom', 'layer1_button', 'layer1_file'])
+        for i in range(steps):
+            writer.writerow([i + 1, f"Question {i}?", 'An answer. ' * 8, f"obj-{i % objects:06d}", 0.5, '', 1, '', ''])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a full csv_to_json.py run')
+    parser.add_argument('--objects', type=int, default=20000, help='Rows in objects.csv (default: 20000)')
+    parser.add_argument('--steps', type=int, default=5000, help='Rows in story-1.csv (default: 5000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs; the best is reported (default: 3)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            build_project(args.objects, args.steps)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                subprocess.run(
+                    [sys.executable, str(SCRIPT), '--force', '--no-manifest-cache'],
+                    check=True, stdout=subprocess.DEVNULL
+                )
+                timings.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+    # ru_maxrss is the largest child so far, in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"csv_to_json.py: {args.objects} objects, {args.steps} steps, best of {args.repeat}: "
+          f"{min(timings):.3f}s, peak RSS {peak_mb:.0f} MB")
+
+if __name__ == '__main__':
+    main()
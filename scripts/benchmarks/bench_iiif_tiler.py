@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the built-in IIIF tiler against iiif.static.IIIFStatic
+
+Creates a large synthetic JPEG in a temporary directory, tiles it with
+both tilers (512px tiles, Image API 3.0, as generate_iiif.py does) and
+reports the time each takes and whether they wrote the same files.
+IIIFStatic is only run when the iiif package is installed.
+
+Before timing, images with extreme aspect ratios (SHAPE_CHECKS) are tiled
+to check that every size listed in info.json is written, down to 1-pixel
+sides.
+
+Usage:
+    python scripts/benchmarks/bench_iiif_tiler.py [--width 8000] [--height 6000] [--repeat 1]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+BASE_ID = 'http://localhost/iiif/objects/bench'
+
+# Wide and tall images whose smallest sizes round to a 1-pixel side
+SHAPE_CHECKS = [(700, 300), (300, 700), (1400, 600), (4000, 100), (100, 4000)]
+
+def build_image(path, width, height):
+    """Write a synthetic photo-like JPEG: gradients plus noise"""
+    from PIL import Image
+
+    red = Image.linear_gradient('L').resize((width, height))
+    green = Image.radial_gradient('L').resize((width, height))
+    blue = Image.effect_noise((width, height), 48)
+    Image.merge('RGB', (red, green, blue)).save(path, 'JPEG', quality=90)
+
+def list_files(root):
+    """Relative paths of every file and symlink under a directory"""
+    return sorted(str(path.relative_to(root)) for path in Path(root).rglob('*') if not path.is_dir() or path.is_symlink())
+
+def check_shapes(tmp):
+    """
+    Tile each of SHAPE_CHECKS and check the full-image sizes on disk
+
+    Returns:
+        List of problems, empty if every shape tiled correctly
+    """
+    from PIL import Image
+    from iiif_tiler import generate_tiles
+
+    problems = []
+    for width, height in SHAPE_CHECKS:
+        output_dir = Path(tmp) / f'shape-{width}x{height}'
+        try:
+            info = generate_tiles(Image.new('RGB', (width, height), 'grey'), output_dir, BASE_ID)
+        except Exception as e:
+            problems.append(f"{width}x{height}: {e}")
+            continue
+        for size in info['sizes']:
+            path = output_dir / 'full' / f"{size['width']}," / '0' / 'default.jpg'
+            if not path.exists():
+                problems.append(f"{width}x{height}: {size['width']}x{size['height']} listed but not written")
+                continue
+            with Image.open(path) as image:
+                if image.width != size['width'] or image.height < 1:
+                    problems.append(f"{width}x{height}: {path.relative_to(output_dir)} is {image.width}x{image.height}")
+    return problems
+
+def time_native(source, output_dir):
+    from PIL import Image
+    from iiif_tiler import generate_tiles
+
+    start = time.perf_counter()
+    with Image.open(source) as img:
+        generate_tiles(img, output_dir, BASE_ID)
+    return time.perf_counter() - start
+
+def time_iiifstatic(source, output_dir):
+    from iiif.static import IIIFStatic
+
+    start = time.perf_counter()
+    IIIFStatic(
+        dst=str(output_dir.parent),
+        prefix=BASE_ID.rsplit('/', 1)[0],
+        tilesize=512,
+        api_version='3.0'
+    ).generate(src=str(source), identifier=output_dir.name)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IIIF tilers')
+    parser.add_argument('--width', type=int, default=8000, help='Synthetic image width (default: 8000)')
+    parser.add_argument('--height', type=int, default=6000, help='Synthetic image height (default: 6000)')
+    parser.add_argument('--repeat', type=int, default=1, help='Timed runs per tiler; the best is reported (default: 1)')
+    args = parser.parse_args()
+
+    try:
+        import iiif.static  # noqa: F401
+        have_iiifstatic = True
+        logging.getLogger('iiif').setLevel(logging.ERROR)
+    except ImportError:
+        have_iiifstatic = False
+        print("iiif is not installed; only timing the built-in tiler (pip install iiif)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        problems = check_shapes(tmp)
+        print(f"Aspect ratio checks ({len(SHAPE_CHECKS)} shapes): {'ok' if not problems else 'FAILED'}")
+        for problem in problems:
+            print(f"  {problem}")
+
+        source = tmp / 'source.jpg'
+        build_image(source, args.width, args.height)
+        print(f"Source: {args.width}x{args.height} JPEG, {os.path.getsize(source) / 1e6:.1f} MB")
+
+        native = min(time_native(source, tmp / f'native-{i}' / 'bench') for i in range(args.repeat))
+        print(f"  built-in tiler: {native:.2f}s")
+
+        if have_iiifstatic:
+            static = min(time_iiifstatic(source, tmp / f'static-{i}' / 'bench') for i in range(args.repeat))
+            print(f"  IIIFStatic:     {static:.2f}s ({static / native:.1f}x slower)")
+            same = list_files(tmp / 'native-0' / 'bench') == list_files(tmp / 'static-0' / 'bench')
+            print(f"  Same tile paths: {'yes' if same else 'NO'}")
+
+    if problems:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
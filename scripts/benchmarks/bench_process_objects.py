@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark csv_to_json.process_objects on a synthetic objects table
+
+Builds an objects table with a realistic mix of problems (file extensions
+in IDs, placeholder and malformed thumbnails, invalid manifest URLs,
+missing local images) inside a temporary project directory, then reports
+rows/second for process_objects. No network requests are made: manifest
+URLs are either empty or rejected before any request is sent.
+
+Usage:
+    python scripts/benchmarks/bench_process_objects.py [--rows 20000] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+def build_table(rows):
+    """Create synthetic object rows and the local images it refers to"""
+    records = []
+    for i in range(rows):
+        object_id = f"obj-{i:06d}"
+        if i % 10 == 0:
+            object_id += '.jpg'
+        elif i % 97 == 0:
+            object_id = f"obj {i:06d}"
+
+        thumbnail = ''
+        if i % 5 == 1:
+            thumbnail = 'n/a' if i % 2 else 'placeholder'
+        elif i % 5 == 2:
+            thumbnail = f"/components//images/thumbs/{i}.jpg"
+        elif i % 5 == 3:
+            thumbnail = f"components/images/thumbs/{i}.pdf"
+
+        manifest = ''
+        if i % 50 == 0:
+            manifest = f"ftp://example.org/{i}/manifest.json"
+
+        records.append({
+            'object_id': object_id,
+            'title': f"Object {i}",
+            'description': 'Synthetic benchmark object',
+            'creator': '',
+            'period': '',
+            'thumbnail': thumbnail,
+            'iiif_manifest': manifest
+        })
+
+    images_dir = Path('components/images/objects')
+    images_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(0, rows, 3):
+        (images_dir / f"obj-{i:06d}.jpg").touch()
+
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark process_objects')
+    parser.add_argument('--rows', type=int, default=20000, help='Rows in the synthetic table (default: 20000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs; the best is reported (default: 3)')
+    args = parser.parse_args()
+
+    from csv_to_json import process_objects
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            rows = build_table(args.rows)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    process_objects(rows, manifest_cache_path=None)
+                timings.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+    best = min(timings)
+    print(f"process_objects: {args.rows} rows, best of {args.repeat}: "
+          f"{best:.3f}s ({args.rows / best:,.0f} rows/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark the search index on a large synthetic corpus
+
+Builds objects.json, a project with stories and glossary terms in a
+temporary directory, using a Zipf-distributed vocabulary with accented
+Spanish words, and runs generate_search_index.py's build on it. Reports
+the build time, the size of the index (total, and per shard raw and
+gzipped, as a static host would serve it) and the latency of queries the
+way search.js runs them from a cold cache: read meta.json, fetch and parse
+the shards matching each word, merge the postings and read the document
+chunks of the top results.
+
+Usage:
+    python scripts/benchmarks/bench_search_index.py [--objects 20000] [--stories 20] [--queries 200]
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from generate_search_index import collect_documents, write_search_index, fold, tokenize
+
+SEED_WORDS = """
+    khipu cuerda nudo tejido algodón lana camélido textil cerámica vasija plata oro
+    virreinato encomienda resguardo reducción cacique muisca inca andino perú bogotá
+    mapa manuscrito retrato pintura óleo grabado escudo cruz iglesia misión
+    portrait painting engraving manuscript map textile silver gold colonial church
+""".split()
+
+def build_vocabulary(rng, size=20000):
+    """Seed words plus made-up ones, most common first"""
+    syllables = ['ca', 'ma', 'pu', 'ti', 'qui', 'lla', 'ña', 'hua', 'ro', 'se', 'to', 'ri', 'na', 'gu', 'yá', 'cé']
+    words = list(SEED_WORDS)
+    while len(words) < size:
+        words.append(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return words
+
+def sentence(rng, vocabulary, cum_weights, length):
+    return ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=length))
+
+def build_project(root, objects, stories, rng):
+    """Write the synthetic corpus under root"""
+    vocabulary = build_vocabulary(rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    data_dir = root / '_data'
+    glossary_dir = root / 'glossary'
+    data_dir.mkdir()
+    glossary_dir.mkdir()
+
+    records = [{
+        'object_id': f"obj-{i:06d}",
+        'title': sentence(rng, vocabulary, cum_weights, 4).title(),
+        'description': sentence(rng, vocabulary, cum_weights, 30),
+        'creator': sentence(rng, vocabulary, cum_weights, 2).title(),
+        'period': f"{1550 + i % 300}",
+        'medium': sentence(rng, vocabulary, cum_weights, 2),
+        'location': sentence(rng, vocabulary, cum_weights, 2).title(),
+    } for i in range(objects)]
+    (data_dir / 'objects.json').write_text(json.dumps(records, ensure_ascii=False), encoding='utf-8')
+
+    project = [{'stories': [{'number': str(n), 'title': f"Story {n}"} for n in range(1, stories + 1)]}]
+    (data_dir / 'project.json').write_text(json.dumps(project), encoding='utf-8')
+    for n in range(1, stories + 1):
+        steps = [{
+            'step': step,
+            'object': f"obj-{rng.randrange(objects):06d}",
+            'question': sentence(rng, vocabulary, cum_weights, 10) + '?',
+            'answer': sentence(rng, vocabulary, cum_weights, 60),
+            'layer1_title': sentence(rng, vocabulary, cum_weights, 3),
+            'layer1_text': f"<p>{sentence(rng, vocabulary, cum_weights, 200)}</p>",
+        } for step in range(1, 31)]
+        (data_dir / f"story-{n}.json").write_text(json.dumps(steps, ensure_ascii=False), encoding='utf-8')
+
+    for n in range(200):
+        (glossary_dir / f"term-{n}.md").write_text(
+            f"---\nterm_id: term-{n}\ntitle: \"{sentence(rng, vocabulary, cum_weights, 2).title()}\"\n---\n\n"
+            f"{sentence(rng, vocabulary, cum_weights, 80)}\n", encoding='utf-8')
+    return vocabulary, data_dir, glossary_dir
+
+def run_query(index_dir, query, max_results=20):
+    """
+    Answer a query as search.js does, reading every file from disk
+
+    Returns:
+        (number of matching documents, bytes read)
+    """
+    read = 0
+
+    def load(path):
+        nonlocal read
+        data = (index_dir / path).read_bytes()
+        read += len(data)
+        return json.loads(data)
+
+    meta = load('meta.json')
+    totals = None
+    for word in dict.fromkeys(tokenize(query)):
+        scores = {}
+        for prefix in meta['shards']:
+            if not (prefix.startswith(word) or word.startswith(prefix)):
+                continue
+            for term, postings in load(f"terms/{prefix}.json").items():
+                if not term.startswith(word):
+                    continue
+                doc = 0
+                for i in range(0, len(postings), 2):
+                    doc += postings[i]
+                    score = postings[i + 1] if term == word else postings[i + 1] / 2
+                    scores[doc] = max(scores.get(doc, 0), score)
+        totals = scores if totals is None else {doc: total + scores[doc] for doc, total in totals.items() if doc in scores}
+
+    top = sorted((totals or {}).items(), key=lambda item: (-item[1], item[0]))[:max_results]
+    for chunk in {doc // meta['docs_per_chunk'] for doc, _ in top}:
+        load(f"docs/{chunk}.json")
+    return len(totals or {}), read
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the search index on a large synthetic corpus')
+    parser.add_argument('--objects', type=int, default=20000, help='Objects in the corpus (default: 20000)')
+    parser.add_argument('--stories', type=int, default=20, help='Stories of 30 steps each (default: 20)')
+    parser.add_argument('--queries', type=int, default=200, help='Queries to time (default: 200)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        vocabulary, data_dir, glossary_dir = build_project(root, args.objects, args.stories, rng)
+        index_dir = root / 'search'
+
+        start = time.perf_counter()
+        documents = collect_documents(data_dir, glossary_dir)
+        stats = write_search_index(documents, index_dir)
+        build_time = time.perf_counter() - start
+
+        shard_sizes = []
+        gzip_total = 0
+        for dirpath, _, filenames in os.walk(index_dir):
+            for name in filenames:
+                data = (Path(dirpath) / name).read_bytes()
+                gzip_total += len(gzip.compress(data))
+                if Path(dirpath).name == 'terms':
+                    shard_sizes.append((len(data), len(gzip.compress(data))))
+
+        # Typed prefixes and whole words, of common and rare terms
+        queries = []
+        for _ in range(args.queries):
+            word = fold(rng.choice(vocabulary[:2000]))
+            kind = rng.random()
+            if kind < 0.4:
+                queries.append(word[:rng.randint(2, max(2, len(word)))])
+            elif kind < 0.8:
+                queries.append(word)
+            else:
+                queries.append(f"{word} {fold(rng.choice(vocabulary[:2000]))}")
+
+        timings = []
+        fetched = []
+        for query in queries:
+            start = time.perf_counter()
+            _, read = run_query(index_dir, query)
+            timings.append((time.perf_counter() - start) * 1000)
+            fetched.append(read)
+
+    print(f"Search index: {stats['documents']} documents ({args.objects} objects, {args.stories} stories, 200 glossary terms)")
+    print(f"  build:   {build_time:.2f}s, {stats['terms']} terms in {stats['shards']} shards")
+    print(f"  size:    {stats['bytes'] / 1e6:.1f} MB ({gzip_total / 1e6:.1f} MB gzipped)")
+    print(f"  shards:  median {statistics.median(s for s, _ in shard_sizes) / 1024:.1f} KB, "
+          f"max {max(s for s, _ in shard_sizes) / 1024:.1f} KB "
+          f"(gzipped max {max(g for _, g in shard_sizes) / 1024:.1f} KB)")
+    print(f"  queries: {len(queries)}, median {statistics.median(timings):.1f} ms, p95 {percentile(timings, 0.95):.1f} ms, "
+          f"median {statistics.median(fetched) / 1024:.0f} KB read (p95 {percentile(fetched, 0.95) / 1024:.0f} KB)")
+
+if __name__ == '__main__':
+    main()
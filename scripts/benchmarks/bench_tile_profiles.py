@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare tile encoding profiles on real images: total size and time
+
+Tiles every image in a directory (the project's object images by default)
+once per profile, the way generate_iiif.py does, and prints the number of
+tiles, their total size and the time spent for each profile. Each image is
+decoded once and shared by all profiles, so the times are tiling and
+encoding only. Only the profile's own format is written; note that
+generate_iiif.py writes JPEG tiles next to WebP ones.
+
+A profile is format:quality, optionally followed by :progressive, e.g.
+jpg:75, jpg:75:progressive or webp:80.
+
+Usage:
+    python scripts/benchmarks/bench_tile_profiles.py [--source-dir components/images/objects]
+        [--profiles jpg:75,jpg:75:progressive,jpg:85,webp:75,webp:80]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+DEFAULT_PROFILES = 'jpg:75,jpg:75:progressive,jpg:85,webp:75,webp:80'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+
+def parse_profile(spec):
+    """'webp:80' -> ('webp', 80, False); 'jpg:75:progressive' -> ('jpg', 75, True)"""
+    from iiif_tiler import TILE_FORMATS
+
+    parts = spec.split(':')
+    if len(parts) not in (2, 3) or parts[0] not in TILE_FORMATS or (len(parts) == 3 and parts[2] != 'progressive'):
+        raise argparse.ArgumentTypeError(f"Invalid profile {spec!r}, expected e.g. jpg:75, jpg:75:progressive or webp:80")
+    return parts[0], int(parts[1]), len(parts) == 3
+
+def tiles_size(root, tile_format):
+    """(count, bytes) of the tiles of one format under a directory"""
+    tiles = [path for path in Path(root).rglob(f'default.{tile_format}') if not path.parent.parent.is_symlink()]
+    return len(tiles), sum(path.stat().st_size for path in tiles)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare tile encoding profiles')
+    parser.add_argument('--source-dir', default='components/images/objects',
+                        help='Images to tile (default: components/images/objects)')
+    parser.add_argument('--profiles', default=DEFAULT_PROFILES,
+                        help=f'Comma-separated profiles (default: {DEFAULT_PROFILES})')
+    args = parser.parse_args()
+
+    from PIL import Image
+    from iiif_tiler import generate_tiles, normalize_mode
+
+    try:
+        profiles = [(spec, parse_profile(spec)) for spec in args.profiles.split(',')]
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    sources = sorted(path for path in Path(args.source_dir).iterdir() if path.suffix.lower() in IMAGE_EXTENSIONS)
+    if not sources:
+        parser.error(f"No images found in {args.source_dir}")
+
+    Image.MAX_IMAGE_PIXELS = None
+    images = []
+    for path in sources:
+        with Image.open(path) as img:
+            images.append((path.stem, normalize_mode(img).copy()))
+    pixels = sum(image.width * image.height for _, image in images)
+    print(f"{len(images)} images, {pixels / 1e6:.1f} megapixels\n")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec, (tile_format, quality, progressive) in profiles:
+            output = Path(tmp) / spec.replace(':', '-')
+            start = time.perf_counter()
+            for name, image in images:
+                generate_tiles(image, output / name, f'http://localhost/iiif/objects/{name}',
+                               quality=quality, formats=[tile_format], progressive=progressive)
+            seconds = time.perf_counter() - start
+            count, size = tiles_size(output, tile_format)
+            rows.append((spec, count, size, seconds))
+
+    baseline = rows[0][2]
+    print(f"{'Profile':<22} {'Tiles':>7} {'Size (MB)':>10} {'vs first':>9} {'Time (s)':>9}")
+    for spec, count, size, seconds in rows:
+        print(f"{spec:<22} {count:>7} {size / 1e6:>10.2f} {size / baseline:>8.0%} {seconds:>9.2f}")
+
+if __name__ == '__main__':
+    main()
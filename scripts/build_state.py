@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Track what each generated file was built from
+
+The build state records, for every output file, the content hashes of the
+inputs it was generated from and the hash of the output itself. An output
+is up to date when it still exists unchanged and every recorded input
+hashes the same, so unchanged CSVs and markdown files can be skipped on
+the next run.
+
+The state lives in .telar-cache/ so CI can restore it between runs; a
+missing or unreadable state file simply means everything is rebuilt.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DEFAULT_STATE_PATH = '.telar-cache/build-state.json'
+STATE_VERSION = 1
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of some bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file's contents, or None if it doesn't exist"""
+    digest = hashlib.sha256()
+    try:
+        # Read in chunks so large source images aren't loaded into memory
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+class BuildState:
+    """Inputs and output hash recorded for each generated file"""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        self.outputs = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH):
+        """Load the state from disk (a missing or corrupt file gives an empty state)"""
+        state = cls(path)
+        if state.path.exists():
+            try:
+                with open(state.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == STATE_VERSION:
+                    state.outputs = data.get('outputs', {})
+            except (OSError, ValueError) as e:
+                print(f"  [WARN] Ignoring unreadable build state {state.path}: {e}")
+        return state
+
+    def save(self):
+        """Write the state to disk"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'outputs': self.outputs}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, output_path):
+        """Return the recorded entry for an output, or None"""
+        return self.outputs.get(str(output_path))
+
+    def is_current(self, output_path, inputs):
+        """
+        Whether an output was built from exactly these inputs and hasn't changed since
+
+        Args:
+            output_path: Generated file
+            inputs: dict of input name -> content hash
+        """
+        entry = self.get(output_path)
+        if not entry or entry.get('inputs') != inputs:
+            return False
+        return hash_file(output_path) == entry.get('output')
+
+    def record(self, output_path, inputs, **extra):
+        """
+        Record the inputs an output was just built from
+
+        Args:
+            output_path: Generated file
+            inputs: dict of input name -> content hash
+            **extra: Additional details to keep with the entry
+        """
+        entry = {'inputs': inputs, 'output': hash_file(output_path)}
+        entry.update(extra)
+        self.outputs[str(output_path)] = entry
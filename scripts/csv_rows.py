@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Read Telar CSV files as a stream of row dictionaries
+
+A small stdlib replacement for the parts of pandas.read_csv the converters
+rely on, so csv_to_json.py doesn't have to import pandas or build a
+DataFrame. Rows flow through generator stages:
+
+    comment lines → CSV records → bad/blank line filtering → typed rows
+
+Values are typed the way pandas would type them, so the generated JSON
+doesn't change:
+
+- Empty cells and the usual NA markers ('NA', 'N/A', 'null', ...) are
+  missing values, represented as NaN
+- A column whose values are all integers holds ints (floats if any value
+  is missing), a column of numbers holds floats, and a column of
+  True/False values holds bools; anything else stays a string
+- Duplicate column names get a numeric suffix ('notes', 'notes.1') and
+  unnamed columns are called 'Unnamed: N'
+- Rows with more fields than the header are skipped with a warning; short
+  rows are padded with missing values. If the first row is longer than
+  the header, its extra leading fields are treated as an unnamed index
+  and dropped from every row
+"""
+
+import csv
+import itertools
+import math
+import re
+
+MISSING = math.nan
+
+# pandas' default na_values
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null'
+])
+
+TRUE_VALUES = frozenset(['True', 'TRUE', 'true'])
+FALSE_VALUES = frozenset(['False', 'FALSE', 'false'])
+
+INT_PATTERN = re.compile(r'\s*[+-]?[0-9]+\s*')
+FLOAT_PATTERN = re.compile(
+    r'\s*[+-]?(?:(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|inf(?:inity)?)\s*',
+    re.IGNORECASE
+)
+
+def is_missing(value):
+    """Whether a value is missing (NaN or None), like pandas.isna for scalars"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def read_lines(csv_path):
+    """
+    Yield the lines of a CSV file, skipping comment lines
+
+    A line is a comment when its first non-blank character is '#'. A '#'
+    anywhere else is kept, so values like hex colours (#2c3e50) survive.
+    """
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip().startswith('#'):
+                yield line
+
+def read_records(lines):
+    """
+    Parse lines into (line number, fields) records, skipping blank lines
+
+    Line numbers count the lines given, for warnings about malformed rows.
+    """
+    reader = csv.reader(lines)
+    for fields in reader:
+        # An empty or whitespace-only line; a quoted empty string ("") is a value
+        if not fields or (len(fields) == 1 and fields[0] and not fields[0].strip()):
+            continue
+        yield reader.line_num, fields
+
+def column_names(header):
+    """
+    Name the columns of a header row the way pandas does
+
+    Empty names become 'Unnamed: N' and repeated names get '.1', '.2', ...
+    """
+    names = [name or f'Unnamed: {i}' for i, name in enumerate(header)]
+    if names and names[0].startswith('\ufeff'):
+        names[0] = names[0][1:]
+
+    counts = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f'{name}.{count}'
+            count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def check_fields(records, width):
+    """Drop records with more fields than the header and pad short ones"""
+    for line_num, fields in records:
+        if len(fields) > width:
+            print(f"  [WARN] Skipping line {line_num}: expected {width} fields, saw {len(fields)}")
+            continue
+        if len(fields) < width:
+            fields = fields + [None] * (width - len(fields))
+        yield fields
+
+def parse_column(values):
+    """
+    Convert one column's raw strings to typed values
+
+    Args:
+        values: List of raw strings, with None for padded cells
+
+    Returns:
+        List of ints, floats, bools or strings, with MISSING for missing cells
+    """
+    present = [value for value in values if value is not None and value not in NA_VALUES]
+    has_missing = len(present) < len(values)
+
+    def convert(parse):
+        return [MISSING if value is None or value in NA_VALUES else parse(value) for value in values]
+
+    if not present:
+        return [MISSING] * len(values)
+
+    if all(INT_PATTERN.fullmatch(value) for value in present):
+        return convert(float if has_missing else int)
+
+    if all(FLOAT_PATTERN.fullmatch(value) for value in present):
+        return convert(float)
+
+    if all(value in TRUE_VALUES or value in FALSE_VALUES for value in present):
+        return convert(lambda value: value in TRUE_VALUES)
+
+    return convert(str)
+
+def read_rows(csv_path):
+    """
+    Read a CSV file as a stream of row dictionaries
+
+    Comment lines and columns whose name starts with '#' (instruction
+    columns) are dropped.
+
+    Args:
+        csv_path: Path to the CSV file
+
+    Yields:
+        dicts mapping column name to typed value, in column order
+
+    Raises:
+        ValueError: If the file has no header row
+    """
+    records = read_records(read_lines(csv_path))
+    header = next(records, None)
+    if header is None:
+        raise ValueError('No columns to parse from file')
+
+    names = column_names(header[1])
+
+    # Leading fields the header has no names for form an index, as in pandas
+    index_width = 0
+    first = next(records, None)
+    if first is not None:
+        index_width = max(len(first[1]) - len(names), 0)
+        records = itertools.chain([first], records)
+    raw_rows = list(check_fields(records, index_width + len(names)))
+
+    # Types are inferred per column, so each column is parsed as a whole
+    keep = [index_width + i for i, name in enumerate(names) if not name.startswith('#')]
+    columns = [parse_column([fields[i] for fields in raw_rows]) for i in keep]
+    kept_names = [names[i - index_width] for i in keep]
+
+    if not columns:
+        yield from ({} for _ in raw_rows)
+        return
+    for values in zip(*columns):
+        yield dict(zip(kept_names, values))
@@ -3,16 +3,74 @@
 Convert CSV files from Google Sheets to JSON for Jekyll
 """
 
-import pandas as pd
+import contextlib
+import hashlib
+import io
 import json
 import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 import markdown
-import urllib.request
-import urllib.error
-from urllib.parse import urlparse
-import ssl
+
+# Import the manifest validator from the scripts directory
+sys.path.insert(0, str(Path(__file__).parent))
+from iiif_validator import (
+    validate_manifests, describe_result, ManifestCache,
+    DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST_LIMIT, DEFAULT_CACHE_PATH, DEFAULT_CACHE_TTL_HOURS
+)
+from object_images import get_image_index
+from build_state import BuildState, hash_bytes, hash_file, DEFAULT_STATE_PATH
+from csv_rows import read_rows, is_missing, MISSING
+from viewer_plan import STORY_OBJECTS_SUFFIX
+
+# Markdown rendering: one reused pipeline, plus a persistent cache of rendered
+# HTML keyed by a hash of the source text and the rendering configuration
+MARKDOWN_EXTENSIONS = ['extra', 'nl2br']
+MARKDOWN_CACHE_DIR = Path('.telar-cache/markdown')
+
+_markdown_renderer = None
+markdown_stats = {'rendered': 0, 'cached': 0}
+
+def render_markdown(text):
+    """
+    Convert markdown to HTML, reusing cached output for unchanged text
+
+    Args:
+        text: Markdown source
+
+    Returns:
+        Rendered HTML string
+    """
+    global _markdown_renderer
+
+    config = json.dumps([markdown.__version__, MARKDOWN_EXTENSIONS])
+    key = hashlib.sha256(f'{config}\n{text}'.encode('utf-8')).hexdigest()
+    cache_path = MARKDOWN_CACHE_DIR / key[:2] / f'{key}.html'
+
+    try:
+        html = cache_path.read_text(encoding='utf-8')
+        markdown_stats['cached'] += 1
+        return html
+    except OSError:
+        pass
+
+    if _markdown_renderer is None:
+        _markdown_renderer = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    html = _markdown_renderer.reset().convert(text)
+    markdown_stats['rendered'] += 1
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f'{key}.{os.getpid()}.tmp')
+        tmp_path.write_text(html, encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"  [WARN] Could not write markdown cache entry: {e}")
+
+    return html
 
 def read_markdown_file(file_path):
     """
@@ -47,7 +105,7 @@ def read_markdown_file(file_path):
             title = title_match.group(1) if title_match else ''
 
             # Convert markdown to HTML
-            html_content = markdown.markdown(body, extensions=['extra', 'nl2br'])
+            html_content = render_markdown(body)
 
             return {
                 'title': title,
@@ -55,7 +113,7 @@ def read_markdown_file(file_path):
             }
         else:
             # No frontmatter, just content
-            html_content = markdown.markdown(content.strip(), extensions=['extra', 'nl2br'])
+            html_content = render_markdown(content.strip())
             return {
                 'title': '',
                 'content': html_content
@@ -72,67 +130,63 @@ def csv_to_json(csv_path, json_path, process_func=None):
     Args:
         csv_path: Path to input CSV file
         json_path: Path to output JSON file
-        process_func: Optional function to process the dataframe before conversion
+        process_func: Optional function that takes the CSV rows and returns the records to write
+
+    Returns:
+        The list of records written to the JSON file, or None if conversion failed
     """
     if not os.path.exists(csv_path):
         print(f"Warning: {csv_path} not found. Skipping.")
-        return
+        return None
 
     try:
-        # Read CSV file and filter out comment lines (starting with #)
-        # We can't use pandas' comment parameter because it treats # anywhere as a comment,
-        # which breaks hex color codes like #2c3e50
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            lines = [line for line in f if not line.strip().startswith('#')]
-
-        # Parse filtered CSV content
-        from io import StringIO
-        csv_content = ''.join(lines)
-        df = pd.read_csv(StringIO(csv_content), on_bad_lines='warn')
-
-        # Filter out columns starting with # (instruction columns)
-        df = df[[col for col in df.columns if not col.startswith('#')]]
+        # Rows are streamed from the file with comment lines and instruction
+        # columns (starting with #) already dropped
+        rows = read_rows(csv_path)
 
         # Apply processing function if provided
-        if process_func:
-            df = process_func(df)
-
-        # Convert to JSON
-        data = df.to_dict('records')
-
-        # If dataframe has metadata (e.g., viewer warnings), prepend as first element
-        if hasattr(df, 'attrs') and 'viewer_warnings' in df.attrs:
-            viewer_warnings = df.attrs['viewer_warnings']
-            if viewer_warnings:  # Only add if there are warnings
-                metadata = {
-                    '_metadata': True,
-                    'viewer_warnings': viewer_warnings
-                }
-                data.insert(0, metadata)
+        data = process_func(rows) if process_func else list(rows)
 
         # Write JSON file
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
         print(f"✓ Converted {csv_path} to {json_path}")
+        return data
 
     except Exception as e:
         print(f"Error converting {csv_path}: {e}")
+        return None
+
+def clean_rows(rows):
+    """
+    Drop the example column and replace missing values with empty strings
+
+    Args:
+        rows: Iterable of row dicts from read_rows
+
+    Returns:
+        List of cleaned row dicts
+    """
+    return [
+        {column: '' if is_missing(value) else value for column, value in row.items() if column != 'example'}
+        for row in rows
+    ]
 
-def process_project_setup(df):
+def process_project_setup(rows):
     """
     Process project setup CSV
     Expected columns: order, title, subtitle (optional)
     """
     stories_list = []
 
-    for _, row in df.iterrows():
+    for row in rows:
         order = str(row.get('order', '')).strip()
         title = row.get('title', '')
         subtitle = row.get('subtitle', '')
 
         # Skip rows with empty order (placeholder rows)
-        if not order or not pd.notna(title):
+        if not order or is_missing(title):
             continue
 
         story_entry = {
@@ -141,293 +195,286 @@ def process_project_setup(df):
         }
 
         # Add subtitle if present
-        if pd.notna(subtitle) and str(subtitle).strip():
+        if not is_missing(subtitle) and str(subtitle).strip():
             story_entry['subtitle'] = str(subtitle).strip()
 
         stories_list.append(story_entry)
 
     # Return stories list structure
-    result = {'stories': stories_list}
-    return pd.DataFrame([result])
+    return [{'stories': stories_list}]
 
-def process_objects(df):
+# Extensions stripped from object_id values, e.g. 'painting-1.jpg' → 'painting-1'
+OBJECT_ID_EXTENSION_PATTERN = re.compile(r'\.(?:jpg|jpeg|png|gif|webp|tif|tiff|bmp|svg)$', re.IGNORECASE)
+
+THUMBNAIL_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.tif', '.tiff')
+THUMBNAIL_PLACEHOLDERS = frozenset(['n/a', 'null', 'none', 'placeholder', 'na', 'thumbnail'])
+
+def process_objects(rows, validation_workers=DEFAULT_MAX_WORKERS, per_host_limit=DEFAULT_PER_HOST_LIMIT,
+                    manifest_cache_path=None, manifest_cache_ttl=DEFAULT_CACHE_TTL_HOURS):
     """
     Process objects CSV
     Expected columns: object_id, title, creator, date, description, etc.
+
+    Args:
+        rows: Iterable of object row dicts
+        validation_workers: Concurrent IIIF manifest requests overall
+        per_host_limit: Concurrent IIIF manifest requests per host
+        manifest_cache_path: Optional path of the persistent manifest validation cache
+        manifest_cache_ttl: Hours before a cached validation result is revalidated
+
+    Returns:
+        List of object records
     """
     # Tracking for summary
     warnings = []
 
-    # Drop example column if it exists
-    if 'example' in df.columns:
-        df = df.drop(columns=['example'])
-
-    # Clean up NaN values
-    df = df.fillna('')
-
     # Remove rows where object_id is empty
-    df = df[df['object_id'].astype(str).str.strip() != '']
-
-    # Validate and clean object_id values
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.tif', '.tiff', '.bmp', '.svg']
-    for idx, row in df.iterrows():
-        object_id = str(row.get('object_id', '')).strip()
-        original_id = object_id
-        modified = False
-
-        # Check for file extensions and strip them
-        for ext in valid_extensions:
-            if object_id.lower().endswith(ext):
-                object_id = object_id[:-len(ext)]
-                modified = True
-                print(f"  [INFO] Stripped file extension from object_id: '{original_id}' → '{object_id}'")
-                break
-
-        # Check for spaces in object_id
+    objects = [obj for obj in clean_rows(rows) if str(obj['object_id']).strip() != '']
+    columns = set(objects[0]) if objects else set()
+
+    # Validate and clean object_id values: strip file extensions
+    for obj in objects:
+        original_id = str(obj['object_id']).strip()
+        if OBJECT_ID_EXTENSION_PATTERN.search(original_id):
+            object_id = OBJECT_ID_EXTENSION_PATTERN.sub('', original_id)
+            print(f"  [INFO] Stripped file extension from object_id: '{original_id}' → '{object_id}'")
+            obj['object_id'] = object_id
+
+    # Check for spaces in object_id
+    for obj in objects:
+        object_id = str(obj['object_id']).strip()
         if ' ' in object_id:
             msg = f"Object ID '{object_id}' contains spaces - this may cause issues with file paths"
             print(f"  [WARN] {msg}")
             warnings.append(msg)
 
-        # Update the dataframe if modified
-        if modified:
-            df.at[idx, 'object_id'] = object_id
-
     # Add object_warning column for IIIF/image validation
-    if 'object_warning' not in df.columns:
-        df['object_warning'] = ''
+    for obj in objects:
+        obj.setdefault('object_warning', '')
 
     # Validate thumbnail field
-    if 'thumbnail' in df.columns:
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.tif', '.tiff']
-        placeholder_values = ['n/a', 'null', 'none', 'placeholder', 'na', 'thumbnail']
-
-        for idx, row in df.iterrows():
-            thumbnail = str(row.get('thumbnail', '')).strip()
-            object_id = row.get('object_id', 'unknown')
-
-            # Skip if already empty
+    if 'thumbnail' in columns:
+        # Each distinct path is checked on disk once
+        existing = {}
+        for obj in objects:
+            thumbnail = str(obj['thumbnail']).strip()
             if not thumbnail:
                 continue
+            object_id = obj['object_id']
+            lowered = thumbnail.lower()
 
             # Check for placeholder values
-            if thumbnail.lower() in placeholder_values:
-                df.at[idx, 'thumbnail'] = ''
+            if lowered in THUMBNAIL_PLACEHOLDERS:
+                obj['thumbnail'] = ''
                 msg = f"Cleared invalid thumbnail placeholder '{thumbnail}' for object {object_id}"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
-                continue
-
             # Check for valid image extension
-            has_valid_extension = any(thumbnail.lower().endswith(ext) for ext in valid_extensions)
-
-            if not has_valid_extension:
-                df.at[idx, 'thumbnail'] = ''
+            elif not lowered.endswith(THUMBNAIL_EXTENSIONS):
+                obj['thumbnail'] = ''
                 msg = f"Cleared invalid thumbnail '{thumbnail}' for object {object_id} (not an image file)"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
-                continue
-
-            # Normalize path to avoid duplicate slashes
-            # Accept both /path and path, ensure single leading slash if present
-            if thumbnail.startswith('/'):
-                # Remove duplicate slashes
-                normalized = '/' + '/'.join(filter(None, thumbnail.split('/')))
-                if normalized != thumbnail:
-                    df.at[idx, 'thumbnail'] = normalized
-                    thumbnail = normalized
-                    print(f"  [INFO] Normalized thumbnail path for object {object_id}: {normalized}")
-
-            # Check if file exists (remove leading slash for filesystem check)
-            file_path = thumbnail.lstrip('/')
-            if not Path(file_path).exists():
-                msg = f"Thumbnail file not found for object {object_id}: {thumbnail}"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
+            else:
+                # Normalize path to avoid duplicate slashes
+                # Accept both /path and path, ensure single leading slash if present
+                if thumbnail.startswith('/'):
+                    normalized = re.sub(r'/{2,}', '/', thumbnail).rstrip('/')
+                    if normalized != thumbnail:
+                        obj['thumbnail'] = thumbnail = normalized
+                        print(f"  [INFO] Normalized thumbnail path for object {object_id}: {thumbnail}")
+
+                # Check if file exists (remove leading slash for filesystem check)
+                if thumbnail not in existing:
+                    existing[thumbnail] = Path(thumbnail.lstrip('/')).exists()
+                if existing[thumbnail]:
+                    continue
                 # Don't clear - file might be added later or exist in different environment
+                msg = f"Thumbnail file not found for object {object_id}: {thumbnail}"
+            print(f"  [WARN] {msg}")
+            warnings.append(msg)
 
     # Validate IIIF manifest field
-    if 'iiif_manifest' in df.columns:
-        for idx, row in df.iterrows():
-            manifest_url = str(row.get('iiif_manifest', '')).strip()
-            object_id = row.get('object_id', 'unknown')
+    if 'iiif_manifest' in columns:
+        manifest_rows = [(obj, str(obj['iiif_manifest']).strip()) for obj in objects]
+        manifest_rows = [(obj, url) for obj, url in manifest_rows if url]
+
+        # Fetch manifests concurrently, then apply results in row order
+        cache = None
+        if manifest_cache_path:
+            cache = ManifestCache.load(manifest_cache_path, manifest_cache_ttl)
+
+        results = validate_manifests(
+            [url for _, url in manifest_rows],
+            max_workers=validation_workers,
+            per_host_limit=per_host_limit,
+            cache=cache
+        )
 
-            # Skip if empty
-            if not manifest_url:
-                continue
+        if cache is not None:
+            cache.save()
+            if cache.hits or cache.revalidated:
+                print(f"  [INFO] Manifest cache: {cache.hits} fresh, {cache.revalidated} revalidated (304)")
 
-            # Check if it's a valid URL
-            parsed = urlparse(manifest_url)
-            if not parsed.scheme in ['http', 'https']:
-                df.at[idx, 'iiif_manifest'] = ''
-                df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet is not valid"
-                msg = f"Cleared invalid IIIF manifest for object {object_id}: not a valid URL"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
-                continue
+        short_warnings = []
+        for obj, manifest_url in manifest_rows:
+            result = results[manifest_url]
+            level, msg = describe_result(result, obj['object_id'], manifest_url)
+            print(f"  [{level}] {msg}")
 
-            # Try to fetch the manifest (with timeout)
-            # Create SSL context that doesn't verify certificates (avoid false positives)
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
+            if result['status'] == 'valid':
+                continue
 
-            try:
-                req = urllib.request.Request(manifest_url, method='HEAD')
-                req.add_header('User-Agent', 'Telar/0.3.1-beta (IIIF validator)')
+            if result['status'] == 'invalid_url':
+                obj['iiif_manifest'] = ''
+            obj['object_warning'] = result['warning']
+            if result['warning_short']:
+                short_warnings.append((obj, result['warning_short']))
+            warnings.append(msg)
 
-                with urllib.request.urlopen(req, timeout=5, context=ssl_context) as response:
-                    content_type = response.headers.get('Content-Type', '')
-
-                    # Check if response is JSON
-                    if 'json' not in content_type.lower():
-                        df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet does not point to a valid IIIF manifest"
-                        msg = f"IIIF manifest for object {object_id} does not return JSON (Content-Type: {content_type})"
-                        print(f"  [WARN] {msg}")
-                        warnings.append(msg)
-                        # Don't clear manifest URL - might still work despite wrong content type
-                        continue
-
-                    # Fetch full content to validate structure
-                    req_get = urllib.request.Request(manifest_url)
-                    req_get.add_header('User-Agent', 'Telar/0.3.1-beta (IIIF validator)')
-
-                    with urllib.request.urlopen(req_get, timeout=10, context=ssl_context) as resp:
-                        try:
-                            data = json.loads(resp.read().decode('utf-8'))
-
-                            # Check for basic IIIF structure
-                            has_context = '@context' in data
-                            has_type = 'type' in data or '@type' in data
-
-                            if not (has_context or has_type):
-                                df.at[idx, 'object_warning'] = f"the IIIF manifest you specified in your configuration CSV or Google Sheet is not properly formatted"
-                                msg = f"IIIF manifest for object {object_id} missing required fields (@context or type)"
-                                print(f"  [WARN] {msg}")
-                                warnings.append(msg)
-                            else:
-                                print(f"  [INFO] Validated IIIF manifest for object {object_id}")
-
-                        except json.JSONDecodeError:
-                            df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet does not point to a valid IIIF manifest"
-                            msg = f"IIIF manifest for object {object_id} is not valid JSON"
-                            print(f"  [WARN] {msg}")
-                            warnings.append(msg)
-
-            except urllib.error.HTTPError as e:
-                if e.code == 404:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet does not exist (error 404)"
-                    df.at[idx, 'object_warning_short'] = "Error 404: manifest not found"
-                elif e.code == 429:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 429). Error 429 means \"Too Many Requests\": the IIIF server is rate-limiting your site because you've been requesting this manifest too many times during development/testing, so their server is temporarily blocking your requests. This will likely resolve itself in 15-30 minutes. Try rebuilding your site later – the issue will likely go away."
-                    df.at[idx, 'object_warning_short'] = "Error 429: rate limiting (try again in 15-30 minutes)"
-                elif e.code == 403:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 403). Error 403 means \"Forbidden\": the IIIF server is blocking access to this manifest. This usually means the manifest requires authentication, has IP restrictions, or is not publicly available. Contact the institution to confirm the manifest can be accessed publicly, or use a different IIIF resource."
-                    df.at[idx, 'object_warning_short'] = "Error 403: access forbidden (likely requires authentication or has IP restrictions)"
-                elif e.code == 401:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 401). Error 401 means \"Unauthorized\": this manifest requires authentication to access. Telar does not support authenticated IIIF manifests. You'll need to use a publicly accessible IIIF manifest instead."
-                    df.at[idx, 'object_warning_short'] = "Error 401: authentication required (not supported by Telar)"
-                elif e.code == 500:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 500). Error 500 means \"Internal Server Error\": the IIIF server is experiencing technical problems. This is not a problem with your configuration - the institution's server is having issues. Try rebuilding your site later to see if the issue has been resolved."
-                    df.at[idx, 'object_warning_short'] = "Error 500: server error (try again later)"
-                elif e.code == 503:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 503). Error 503 means \"Service Unavailable\": the IIIF server is temporarily unavailable, possibly due to maintenance or being overloaded. This is not a problem with your configuration. Try rebuilding your site later - the server should come back online."
-                    df.at[idx, 'object_warning_short'] = "Error 503: server temporarily unavailable (try again later)"
-                elif e.code == 502:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 502). Error 502 means \"Bad Gateway\": there's a problem with the IIIF server's infrastructure. This is not a problem with your configuration - the institution's server is having connectivity issues. Try rebuilding your site later to see if the issue has been resolved."
-                    df.at[idx, 'object_warning_short'] = "Error 502: server connectivity issue (try again later)"
-                else:
-                    df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error {e.code})"
-                    df.at[idx, 'object_warning_short'] = f"Error {e.code}: could not be accessed"
-                msg = f"IIIF manifest for object {object_id} returned HTTP {e.code}: {manifest_url}"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
-            except urllib.error.URLError as e:
-                df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be reached"
-                df.at[idx, 'object_warning_short'] = "Network error: could not be reached"
-                msg = f"IIIF manifest for object {object_id} could not be reached: {e.reason}"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
-            except Exception as e:
-                df.at[idx, 'object_warning'] = f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be validated"
-                df.at[idx, 'object_warning_short'] = "Validation error: could not be validated"
-                msg = f"Error validating IIIF manifest for object {object_id}: {str(e)}"
-                print(f"  [WARN] {msg}")
-                warnings.append(msg)
+        if short_warnings:
+            if 'object_warning_short' not in columns:
+                # Rows without a short warning are left as NaN
+                for obj in objects:
+                    obj['object_warning_short'] = MISSING
+            for obj, warning_short in short_warnings:
+                obj['object_warning_short'] = warning_short
 
     # Validate that objects have either IIIF manifest OR local image file
-    for idx, row in df.iterrows():
-        object_id = row.get('object_id', 'unknown')
-        iiif_manifest = str(row.get('iiif_manifest', '')).strip()
-
-        # Skip if already has a valid IIIF manifest
-        if iiif_manifest:
+    image_index = get_image_index()
+    for obj in objects:
+        if 'iiif_manifest' in columns and str(obj['iiif_manifest']).strip():
             continue
 
         # No external IIIF manifest - check for local image file
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.tif', '.tiff']
-        has_local_image = False
-
-        for ext in valid_extensions:
-            local_image_path = Path(f'components/images/objects/{object_id}{ext}')
-            if local_image_path.exists():
-                has_local_image = True
-                print(f"  [INFO] Object {object_id} uses local image: {local_image_path}")
-                break
+        object_id = obj['object_id']
+        local_image_path = image_index.find(object_id)
+        if local_image_path:
+            print(f"  [INFO] Object {object_id} uses local image: {local_image_path}")
+            continue
 
         # Warn if object has neither external manifest nor local image
-        if not has_local_image:
-            error_msg = f"the image file for the object ID you specified ({object_id}) in your configuration CSV or Google Sheet was not found in components/images/objects/"
-            df.at[idx, 'object_warning'] = error_msg
-            msg = f"Object {object_id} has no IIIF manifest or local image file"
-            print(f"  [WARN] {msg}")
-            warnings.append(msg)
+        obj['object_warning'] = f"the image file for the object ID you specified ({object_id}) in your configuration CSV or Google Sheet was not found in components/images/objects/"
+        msg = f"Object {object_id} has no IIIF manifest or local image file"
+        print(f"  [WARN] {msg}")
+        warnings.append(msg)
 
     # Print summary if there were issues
     if warnings:
         print(f"\n  Objects validation summary: {len(warnings)} warning(s)")
 
-    return df
+    return objects
 
-def process_story(df):
-    """
-    Process story CSV with file references
-    Expected columns: step, question, answer, object, x, y, zoom, layer1_file, layer2_file, etc.
+def index_objects(objects_list):
     """
-    # Tracking for summary
-    warnings = []
+    Build the object registry used to validate story references
 
-    # Drop example column if it exists
-    if 'example' in df.columns:
-        df = df.drop(columns=['example'])
+    Args:
+        objects_list: Converted object records (as written to objects.json)
 
-    # Clean up NaN values
-    df = df.fillna('')
+    Returns:
+        dict mapping object_id to object
+    """
+    return {obj['object_id']: obj for obj in objects_list}
 
-    # Remove completely empty rows
-    df = df[df.astype(str).apply(lambda x: x.str.strip()).ne('').any(axis=1)]
+def load_objects_data(objects_json_path='_data/objects.json'):
+    """
+    Load the object registry from a previously written objects.json
 
-    # Load objects data for validation
+    Fallback for when the objects haven't been converted in this run.
+
+    Returns:
+        dict mapping object_id to object, empty if the file is missing or unreadable
+    """
     objects_data = {}
-    objects_json_path = Path('_data/objects.json')
+    objects_json_path = Path(objects_json_path)
     if objects_json_path.exists():
         try:
             with open(objects_json_path, 'r', encoding='utf-8') as f:
-                objects_list = json.load(f)
-                # Create lookup dictionary by object_id
-                objects_data = {obj['object_id']: obj for obj in objects_list}
+                objects_data = index_objects(json.load(f))
         except Exception as e:
             print(f"  [WARN] Could not load objects.json for validation: {e}")
+    return objects_data
+
+# Object fields the story viewer reads (story.js); story pages inline only these
+STORY_OBJECT_FIELDS = ['object_id', 'iiif_manifest']
+
+def story_objects(steps, objects_data):
+    """
+    Compact records of the objects a story's steps show
+
+    Args:
+        steps: The story's step records (its data file's contents)
+        objects_data: dict mapping object_id to object
+
+    Returns:
+        List of records with STORY_OBJECT_FIELDS, in order of first use;
+        objects missing from the registry are left out
+    """
+    records = {}
+    for step in steps:
+        object_id = str(step.get('object', '')).strip() if isinstance(step, dict) else ''
+        if object_id and object_id not in records and object_id in objects_data:
+            obj = objects_data[object_id]
+            records[object_id] = {field: obj.get(field, '') for field in STORY_OBJECT_FIELDS}
+    return list(records.values())
+
+def write_story_objects(json_path, objects_data):
+    """
+    Write the objects file of a story next to its data file
+
+    story.html inlines it instead of the whole objects.json. The file is
+    only rewritten when its contents change.
+
+    Returns:
+        True if the file was written
+    """
+    json_path = Path(json_path)
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            steps = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not load {json_path}: {e}")
+        return False
+
+    contents = json.dumps(story_objects(steps, objects_data), indent=2, ensure_ascii=False)
+    objects_path = json_path.with_name(f"{json_path.stem}{STORY_OBJECTS_SUFFIX}.json")
+    if objects_path.exists() and objects_path.read_text(encoding='utf-8') == contents:
+        return False
+    objects_path.write_text(contents, encoding='utf-8')
+    print(f"✓ Wrote {objects_path}")
+    return True
+
+def process_story(rows, objects_data=None):
+    """
+    Process story CSV with file references
+    Expected columns: step, question, answer, object, x, y, zoom, layer1_file, layer2_file, etc.
+
+    Args:
+        rows: Iterable of story step row dicts
+        objects_data: Object registry ({object_id: object}) for reference
+                      validation; loaded from _data/objects.json when not given
+
+    Returns:
+        List of step records, preceded by a metadata record listing the
+        viewer warnings if there are any
+    """
+    # Tracking for summary
+    warnings = []
+
+    # Remove completely empty rows
+    steps = [step for step in clean_rows(rows) if any(str(value).strip() for value in step.values())]
+
+    # Load objects data for validation
+    if objects_data is None:
+        objects_data = load_objects_data()
 
     # Add viewer_warning column if it doesn't exist
-    if 'viewer_warning' not in df.columns:
-        df['viewer_warning'] = ''
+    for step in steps:
+        step.setdefault('viewer_warning', '')
+    columns = list(steps[0]) if steps else []
 
     # Validate object references
-    if 'object' in df.columns and objects_data:
-        for idx, row in df.iterrows():
-            object_id = str(row.get('object', '')).strip()
-            step_num = row.get('step', 'unknown')
+    if 'object' in columns and objects_data:
+        for step in steps:
+            object_id = str(step.get('object', '')).strip()
+            step_num = step.get('step', 'unknown')
 
             # Skip if no object specified
             if not object_id:
@@ -435,8 +482,7 @@ def process_story(df):
 
             # Check if object exists
             if object_id not in objects_data:
-                error_msg = f"the object <code>{object_id}</code> was not found in <code>objects.csv</code>"
-                df.at[idx, 'viewer_warning'] = error_msg
+                step['viewer_warning'] = f"the object <code>{object_id}</code> was not found in <code>objects.csv</code>"
                 msg = f"Story step {step_num} references missing object: {object_id}"
                 print(f"  [WARN] {msg}")
                 warnings.append(msg)
@@ -449,26 +495,18 @@ def process_story(df):
             # If no external IIIF manifest, check for local image file
             if not iiif_manifest:
                 # Check for local image in components/images/objects/
-                valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.tif', '.tiff']
-                has_local_image = False
-
-                for ext in valid_extensions:
-                    local_image_path = Path(f'components/images/objects/{object_id}{ext}')
-                    if local_image_path.exists():
-                        has_local_image = True
-                        print(f"  [INFO] Object {object_id} uses local image: {local_image_path}")
-                        break
-
-                # Only warn if object has neither external manifest nor local image
-                if not has_local_image:
-                    error_msg = f"the object <code>{object_id}</code> has no IIIF manifest or local image file"
-                    df.at[idx, 'viewer_warning'] = error_msg
+                local_image_path = get_image_index().find(object_id)
+                if local_image_path:
+                    print(f"  [INFO] Object {object_id} uses local image: {local_image_path}")
+                else:
+                    # Only warn if object has neither external manifest nor local image
+                    step['viewer_warning'] = f"the object <code>{object_id}</code> has no IIIF manifest or local image file"
                     msg = f"Story step {step_num} references object without IIIF source: {object_id}"
                     print(f"  [WARN] {msg}")
                     warnings.append(msg)
 
     # Process file reference columns
-    for col in df.columns:
+    for col in columns:
         if col.endswith('_file'):
             # Determine the base name (e.g., 'layer1' from 'layer1_file')
             base_name = col.replace('_file', '')
@@ -477,59 +515,47 @@ def process_story(df):
             title_col = f'{base_name}_title'
             text_col = f'{base_name}_text'
 
-            # Initialize new columns with empty strings
-            if title_col not in df.columns:
-                df[title_col] = ''
-            if text_col not in df.columns:
-                df[text_col] = ''
-
             # Read markdown files and populate columns
-            for idx, row in df.iterrows():
-                file_ref = row[col]
+            for step in steps:
+                step.setdefault(title_col, '')
+                step.setdefault(text_col, '')
+
+                # Drop the _file column as it's no longer needed in JSON
+                file_ref = step.pop(col)
                 if file_ref and file_ref.strip():
                     # Prepend 'stories/' to the path for story files
                     file_path = f"stories/{file_ref.strip()}"
                     markdown_data = read_markdown_file(file_path)
                     if markdown_data:
-                        df.at[idx, title_col] = markdown_data['title']
-                        df.at[idx, text_col] = markdown_data['content']
+                        step[title_col] = markdown_data['title']
+                        step[text_col] = markdown_data['content']
                     else:
                         # Insert error message for missing file
-                        step_num = row.get('step', 'unknown')
-                        df.at[idx, title_col] = 'Content Missing'
-                        error_html = f'''<div class="alert alert-warning" role="alert">
+                        step_num = step.get('step', 'unknown')
+                        step[title_col] = 'Content Missing'
+                        step[text_col] = f'''<div class="alert alert-warning" role="alert">
     <strong>Content file missing:</strong> <code>{file_ref.strip()}</code><br>
     Please add this file to <code>components/texts/stories/</code> or remove the reference from the CSV.
 </div>'''
-                        df.at[idx, text_col] = error_html
                         msg = f"Missing markdown file for story step {step_num}, {base_name}: {file_ref.strip()}"
                         print(f"  [WARN] {msg}")
                         warnings.append(msg)
 
-            # Drop the _file column as it's no longer needed in JSON
-            df = df.drop(columns=[col])
-
     # Set default coordinates for empty values
-    coordinate_columns = ['x', 'y', 'zoom']
-    for col in coordinate_columns:
-        if col in df.columns:
-            # Convert to string first to handle NaN values
-            df[col] = df[col].astype(str)
-            # Set defaults for empty or 'nan' values
-            if col == 'x':
-                df.loc[df[col].isin(['', 'nan']), col] = '0.5'
-            elif col == 'y':
-                df.loc[df[col].isin(['', 'nan']), col] = '0.5'
-            elif col == 'zoom':
-                df.loc[df[col].isin(['', 'nan']), col] = '1'
+    coordinate_defaults = {'x': '0.5', 'y': '0.5', 'zoom': '1'}
+    for col, default in coordinate_defaults.items():
+        if col in columns:
+            for step in steps:
+                value = str(step[col])
+                step[col] = default if value in ('', 'nan') else value
 
     # Collect all warnings for intro display
     all_warnings = []
-    for idx, row in df.iterrows():
-        step_num = row.get('step', 'unknown')
+    for step in steps:
+        step_num = step.get('step', 'unknown')
 
         # Check for viewer warnings (missing object/IIIF)
-        viewer_warning = row.get('viewer_warning', '').strip()
+        viewer_warning = step.get('viewer_warning', '').strip()
         if viewer_warning:
             all_warnings.append({
                 'step': step_num,
@@ -541,12 +567,11 @@ def process_story(df):
         # Look for "Content Missing" title which indicates missing files
         for layer in ['layer1', 'layer2']:
             title_col = f'{layer}_title'
-            if title_col in row and row[title_col] == 'Content Missing':
+            if title_col in step and step[title_col] == 'Content Missing':
                 # Extract the filename from the error HTML in the text column
                 text_col = f'{layer}_text'
-                text = row.get(text_col, '')
+                text = step.get(text_col, '')
                 # Extract filename from the HTML (it's between <code> tags)
-                import re
                 filename_match = re.search(r'<code>(.*?)</code>', text)
                 # Get layer number for display (1 or 2)
                 layer_num = layer[-1]  # Get '1' or '2' from 'layer1' or 'layer2'
@@ -565,17 +590,140 @@ def process_story(df):
                         'message': f'the file for the layer {layer_num} panel was not found'
                     })
 
-    # Store warnings in dataframe as metadata (will be added to JSON)
-    df.attrs['viewer_warnings'] = all_warnings
-
     # Print summary if there were issues
     if warnings:
         print(f"\n  Story validation summary: {len(warnings)} warning(s)")
 
-    return df
+    # Warnings go first in the JSON as a metadata record
+    if all_warnings:
+        steps.insert(0, {
+            '_metadata': True,
+            'viewer_warnings': all_warnings
+        })
+
+    return steps
+
+# Object registry handed to story conversion workers (see _init_story_worker)
+_worker_objects_data = None
+
+def _init_story_worker(objects_data):
+    """Receive the object registry once per worker process"""
+    global _worker_objects_data
+    _worker_objects_data = objects_data
+
+def convert_story_file(csv_path, json_path, objects_data=None):
+    """
+    Convert one story or chapter CSV, capturing its log output
+
+    Used by the process pool so each file's messages are printed together
+    instead of interleaving with other workers.
+
+    Returns:
+        (success, log text, markdown stats for this file) tuple
+    """
+    if objects_data is None:
+        objects_data = _worker_objects_data
+
+    before = dict(markdown_stats)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        data = csv_to_json(csv_path, json_path, partial(process_story, objects_data=objects_data))
+
+    stats = {key: markdown_stats[key] - before[key] for key in markdown_stats}
+    return data is not None, log.getvalue(), stats
+
+# Modules whose code shapes the generated JSON; editing any of them rebuilds everything
+CONVERTER_MODULES = ['csv_to_json.py', 'csv_rows.py', 'iiif_validator.py', 'object_images.py', 'build_state.py']
+
+def converter_version():
+    """Hash of the converter code and the library versions that affect its output"""
+    scripts_dir = Path(__file__).parent
+    parts = [hash_file(scripts_dir / name) or '' for name in CONVERTER_MODULES]
+    parts.append(markdown.__version__)
+    return hash_bytes('\n'.join(parts).encode('utf-8'))
+
+def story_markdown_files(csv_path):
+    """
+    List the markdown files referenced by a story CSV's *_file columns
+
+    Returns:
+        Sorted list of paths under components/texts/stories/
+    """
+    import csv
+
+    files = set()
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        lines = (line for line in f if not line.strip().startswith('#'))
+        for row in csv.DictReader(lines):
+            for column, value in row.items():
+                if column and column.endswith('_file') and not column.startswith('#') and value and value.strip():
+                    files.add(f"components/texts/stories/{value.strip()}")
+    return sorted(files)
+
+def manifests_fresh(entry, manifest_cache_path, manifest_cache_ttl):
+    """
+    Whether every external manifest recorded for objects.json has a fresh cache entry
+
+    Without a cache (or with an expired entry) the manifests must be checked
+    again, so objects.json has to be rebuilt.
+    """
+    manifest_urls = entry.get('manifest_urls', []) if entry else []
+    if not manifest_urls:
+        return True
+    if not manifest_cache_path:
+        return False
+    cache = ManifestCache.load(manifest_cache_path, manifest_cache_ttl)
+    return all(cache.is_fresh(url) for url in manifest_urls)
 
 def main():
     """Main conversion process"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Convert Telar CSV files to JSON for Jekyll'
+    )
+    parser.add_argument(
+        '--validation-workers',
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f'Concurrent IIIF manifest validation requests (default: {DEFAULT_MAX_WORKERS})'
+    )
+    parser.add_argument(
+        '--per-host-limit',
+        type=int,
+        default=DEFAULT_PER_HOST_LIMIT,
+        help=f'Concurrent IIIF manifest requests per host (default: {DEFAULT_PER_HOST_LIMIT})'
+    )
+    parser.add_argument(
+        '--manifest-cache',
+        default=DEFAULT_CACHE_PATH,
+        help=f'IIIF manifest validation cache file (default: {DEFAULT_CACHE_PATH})'
+    )
+    parser.add_argument(
+        '--manifest-cache-ttl',
+        type=float,
+        default=DEFAULT_CACHE_TTL_HOURS,
+        help=f'Hours before a cached manifest is revalidated (default: {DEFAULT_CACHE_TTL_HOURS})'
+    )
+    parser.add_argument(
+        '--no-manifest-cache',
+        action='store_true',
+        help='Validate every IIIF manifest over the network, ignoring the cache'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Story/chapter files to convert in parallel (default: 1; 0 uses one process per CPU)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Reconvert every file, even if its inputs have not changed'
+    )
+
+    args = parser.parse_args()
+
     data_dir = Path('_data')
     data_dir.mkdir(exist_ok=True)
 
@@ -584,42 +732,107 @@ def main():
     print("Converting CSV files to JSON...")
     print("-" * 50)
 
+    # Outputs are only regenerated when one of their recorded inputs changed
+    state = BuildState(DEFAULT_STATE_PATH) if args.force else BuildState.load(DEFAULT_STATE_PATH)
+    version = converter_version()
+    images = get_image_index().fingerprint()
+    manifest_cache_path = None if args.no_manifest_cache else args.manifest_cache
+
+    def up_to_date(csv_path, json_path, inputs):
+        if state.is_current(json_path, inputs):
+            print(f"✓ Skipped {csv_path} ({json_path} is up to date)")
+            return True
+        return False
+
     # Convert project setup
-    csv_to_json(
-        'components/structures/project.csv',
-        '_data/project.json',
-        process_project_setup
-    )
+    project_csv = 'components/structures/project.csv'
+    project_json = '_data/project.json'
+    project_inputs = {'converter': version, 'csv': hash_file(project_csv)}
+    if not up_to_date(project_csv, project_json, project_inputs):
+        if csv_to_json(project_csv, project_json, process_project_setup) is not None:
+            state.record(project_json, project_inputs)
 
     # Convert objects
-    csv_to_json(
-        'components/structures/objects.csv',
-        '_data/objects.json',
-        process_objects
-    )
+    # External manifests are re-checked whenever their cached validation expires
+    objects_csv = 'components/structures/objects.csv'
+    objects_json = '_data/objects.json'
+    objects_inputs = {'converter': version, 'csv': hash_file(objects_csv), 'images': images}
+    objects_list = None
+    if not (manifests_fresh(state.get(objects_json), manifest_cache_path, args.manifest_cache_ttl)
+            and up_to_date(objects_csv, objects_json, objects_inputs)):
+        objects_list = csv_to_json(
+            objects_csv,
+            objects_json,
+            partial(
+                process_objects,
+                validation_workers=args.validation_workers,
+                per_host_limit=args.per_host_limit,
+                manifest_cache_path=manifest_cache_path,
+                manifest_cache_ttl=args.manifest_cache_ttl
+            )
+        )
+
+    # The converted objects stay in memory as the registry shared by every
+    # story conversion; objects.json is only read back if they weren't
+    # converted in this run
+    if objects_list is not None:
+        objects_data = index_objects(objects_list)
+        manifest_urls = sorted({str(obj.get('iiif_manifest', '')).strip() for obj in objects_data.values()} - {''})
+        state.record(objects_json, objects_inputs, manifest_urls=manifest_urls)
+    else:
+        objects_data = load_objects_data(objects_json)
 
     # Note: Glossary is now sourced directly from components/texts/glossary/
     # and processed by generate_collections.py
 
     # Convert story files
     # Look for any CSV files that start with "story-" or "chapter-"
-    for csv_file in structures_dir.glob('story-*.csv'):
-        json_filename = csv_file.stem + '.json'
-        json_file = data_dir / json_filename
-        csv_to_json(
-            str(csv_file),
-            str(json_file),
-            process_story
-        )
-
-    for csv_file in structures_dir.glob('chapter-*.csv'):
-        json_filename = csv_file.stem + '.json'
-        json_file = data_dir / json_filename
-        csv_to_json(
-            str(csv_file),
-            str(json_file),
-            process_story
-        )
+    story_files = sorted(structures_dir.glob('story-*.csv')) + sorted(structures_dir.glob('chapter-*.csv'))
+    objects_hash = hash_file(objects_json)
+
+    conversions = []
+    for csv_file in story_files:
+        csv_path = str(csv_file)
+        json_path = str(data_dir / (csv_file.stem + '.json'))
+        inputs = {'converter': version, 'csv': hash_file(csv_path), 'images': images, 'objects': objects_hash}
+        for markdown_path in story_markdown_files(csv_path):
+            inputs[f'markdown:{markdown_path}'] = hash_file(markdown_path)
+        if not up_to_date(csv_path, json_path, inputs):
+            conversions.append((csv_path, json_path, inputs))
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    if jobs > 1 and len(conversions) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(conversions)),
+            initializer=_init_story_worker,
+            initargs=(objects_data,)
+        ) as executor:
+            futures = [executor.submit(convert_story_file, csv_path, json_path)
+                       for csv_path, json_path, _ in conversions]
+            # Print each file's log in order, as the serial path would
+            for (_, json_path, inputs), future in zip(conversions, futures):
+                success, log, stats = future.result()
+                print(log, end='')
+                for key, count in stats.items():
+                    markdown_stats[key] += count
+                if success:
+                    state.record(json_path, inputs)
+    else:
+        for csv_path, json_path, inputs in conversions:
+            if csv_to_json(csv_path, json_path, partial(process_story, objects_data=objects_data)) is not None:
+                state.record(json_path, inputs)
+
+    # Each story's objects, for its page to inline; cheap enough to check
+    # every run, so they also follow objects.json edits
+    for csv_file in story_files:
+        json_path = data_dir / (csv_file.stem + '.json')
+        if json_path.exists():
+            write_story_objects(json_path, objects_data)
+
+    state.save()
+
+    if markdown_stats['rendered'] or markdown_stats['cached']:
+        print(f"Markdown panels: {markdown_stats['rendered']} rendered, {markdown_stats['cached']} from cache")
 
     print("-" * 50)
     print("Conversion complete!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Replace byte-identical IIIF tiles with hardlinks to one copy
+
+Scans with wide uniform margins produce many identical tiles (plain
+background compresses to the same bytes), and the smallest pyramid levels
+repeat across near-duplicate objects. Tiles are grouped by size, hashed
+only when another tile has the same size, and every duplicate is replaced
+by a hardlink to the first copy, so each distinct tile is stored once.
+
+Tiles are only ever replaced as a whole (generate_iiif.py removes an
+object's directory before retiling it), so linked copies can't diverge.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from build_state import hash_file
+
+def find_tiles(root):
+    """
+    Tile files (default.{format}) under a directory
+
+    Symlinked directories (the "w,h" size aliases) are not followed, so
+    every tile is listed once.
+    """
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.startswith('default.'):
+                path = os.path.join(dirpath, name)
+                if not os.path.islink(path):
+                    yield path
+
+def link_duplicate(canonical, path):
+    """Atomically replace path with a hardlink to canonical"""
+    temp_path = f"{path}.dedup"
+    os.link(canonical, temp_path)
+    os.replace(temp_path, path)
+
+def dedup_tiles(root):
+    """
+    Hardlink identical tiles under a directory to a single copy
+
+    Args:
+        root: Directory holding every object's tiles
+
+    Returns:
+        dict with tiles (scanned), duplicates (tiles sharing another's
+        bytes), linked (replaced by this run), bytes (total tile bytes,
+        counting each file once per path) and saved (bytes no longer stored
+        more than once)
+    """
+    by_size = {}
+    total_bytes = 0
+    tiles = 0
+    for path in find_tiles(root):
+        size = os.path.getsize(path)
+        by_size.setdefault(size, []).append(path)
+        total_bytes += size
+        tiles += 1
+
+    duplicates = linked = saved = 0
+    for size, paths in by_size.items():
+        if len(paths) < 2:
+            continue
+
+        # Files already linked together are hashed once
+        hashes = {}
+        by_hash = {}
+        for path in sorted(paths):
+            stat = os.stat(path)
+            inode = (stat.st_dev, stat.st_ino)
+            if inode not in hashes:
+                hashes[inode] = hash_file(path)
+            by_hash.setdefault(hashes[inode], []).append((path, inode))
+
+        for copies in by_hash.values():
+            canonical, canonical_inode = copies[0]
+            for path, inode in copies[1:]:
+                duplicates += 1
+                saved += size
+                if inode == canonical_inode:
+                    continue
+                try:
+                    link_duplicate(canonical, path)
+                    linked += 1
+                except OSError as e:
+                    # e.g. a file system without hardlinks; the copy stays
+                    print(f"  ⚠️  Could not link {path}: {e}")
+                    saved -= size
+
+    return {'tiles': tiles, 'duplicates': duplicates, 'linked': linked, 'bytes': total_bytes, 'saved': saved}
+
+def format_dedup_report(stats):
+    """One-line summary of a dedup_tiles result"""
+    share = stats['saved'] / stats['bytes'] if stats['bytes'] else 0
+    return (f"{stats['duplicates']} of {stats['tiles']} tiles are duplicates "
+            f"({stats['linked']} newly linked); {stats['saved'] / 1e6:.1f} MB saved ({share:.0%} of tile bytes)")
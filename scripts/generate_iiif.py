@@ -2,155 +2,300 @@
 """
 Generate IIIF tiles and manifests from source images
 
-Uses iiif library (Python) to generate static IIIF Level 0 tiles.
-Alternative to Bodleian tool, simpler for basic use cases.
+Generates static IIIF Level 0 tiles with the built-in pyramid tiler
+(iiif_tiler.py), plus a Presentation API manifest for each object.
 """
 
 import os
 import sys
+import io
 import json
+import time
 import shutil
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 
+# Import the shared object image index from the scripts directory
+sys.path.insert(0, str(Path(__file__).parent))
+from object_images import ObjectImageIndex
+from build_state import BuildState, hash_bytes, hash_file, DEFAULT_STATE_PATH
+from iiif_tiler import (generate_tiles, generate_tiles_from_bands, largest_level_within, level_size, normalize_mode,
+                        write_info, IIIF_API_VERSION, TILE_FORMATS, TILE_QUALITY)
+from image_bands import band_reader
+from dedup_tiles import dedup_tiles, format_dedup_report
+from tile_store import TileStore, DEFAULT_STORE_DIR
+from viewer_plan import story_data_files, write_viewer_plans
+from thumbnails import (ThumbnailCache, fetch_external_thumbnail, save_thumbnail, thumbnail_from_tiles,
+                        thumbnail_settings, THUMBNAIL_URL_PATH, DEFAULT_CACHE_DIR as THUMBNAIL_CACHE_DIR)
+
+TILE_SIZE = 512
+
+OBJECTS_JSON = '_data/objects.json'
+
+# Served at thumbnails.THUMBNAIL_URL_PATH
+DEFAULT_THUMBNAIL_DIR = 'iiif/thumbnails'
+
+# Modules whose code shapes the tiles; editing any of them retiles everything
+GENERATOR_MODULES = ['generate_iiif.py', 'iiif_tiler.py', 'image_bands.py']
+
+# Written next to info.json once an object's tiles are complete
+STAMP_FILENAME = '.build-stamp.json'
+
+# JPEG quality of the base image ({object_id}.jpg) when it is re-encoded
+BASE_IMAGE_QUALITY = 95
+
+# Longest side of the base image, the manifest's painting body, which
+# non-tiling clients download whole (--full-base-image keeps full resolution)
+BASE_IMAGE_MAX_SIZE = 2048
+
+# Full-image derivatives are written for every pyramid level up to this
+# size and listed in info.json sizes, for a sharp overview in one request
+FULL_SIZE_MAX = 1024
+
+# EXIF tag holding the camera's rotation of the image
+EXIF_ORIENTATION = 0x0112
+
+# objects.json fields listed in a manifest's metadata, with their labels
+MANIFEST_METADATA_FIELDS = [
+    ('creator', 'Creator'),
+    ('period', 'Period'),
+    ('medium', 'Medium'),
+    ('dimensions', 'Dimensions'),
+    ('location', 'Location'),
+]
+
 def check_dependencies():
     """Check if required dependencies are installed"""
     try:
-        from iiif.static import IIIFStatic
         from PIL import Image
         return True
     except ImportError as e:
         print("❌ Missing required dependencies!")
         print("\nPlease install:")
-        print("  pip install iiif Pillow")
+        print("  pip install Pillow")
         print("\nOr use the provided requirements file:")
         print("  pip install -r scripts/requirements.txt")
         return False
 
-def generate_iiif_for_image(image_path, output_dir, object_id, base_url):
+def allow_large_images():
+    """
+    Turn off Pillow's decompression bomb check
+
+    The check protects against untrusted files that decode to huge rasters.
+    Source images here belong to the site, and large archival scans are
+    expected; the image memory limit decides how they are read instead.
+    """
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None
+
+def tile_encoding(tile_format='jpg', quality=TILE_QUALITY, progressive=False, base_image_size=BASE_IMAGE_MAX_SIZE):
+    """
+    Settings for encoding tiles and the base image
+
+    Args:
+        tile_format: Preferred tile format (a key of iiif_tiler.TILE_FORMATS);
+                     formats other than JPEG are written alongside JPEG
+        quality: Encoder quality of the tiles, 1-100
+        progressive: Write progressive JPEG tiles and base images
+        base_image_size: Longest side of the base image in pixels, or None
+                         for full resolution
+
+    Returns:
+        dict with formats (preferred first), quality, progressive and
+        base_image_size
+    """
+    formats = ['jpg'] if tile_format == 'jpg' else [tile_format, 'jpg']
+    return {'formats': formats, 'quality': quality, 'progressive': progressive, 'base_image_size': base_image_size}
+
+def generate_iiif_for_image(image_path, output_dir, object_id, base_url, image_memory_limit=None, metadata=None,
+                            encoding=None):
     """
     Generate IIIF tiles for a single image
 
+    The image is decoded once: the tiler and the base image are both fed
+    from the same in-memory copy, already converted to a JPEG-compatible
+    mode. Images whose estimated decode memory exceeds image_memory_limit
+    are read in bands where the format allows it (striped or tiled TIFF),
+    and their base image is capped to fit the limit. The base image is
+    also scaled to fit encoding['base_image_size'] unless that is None.
+
     Args:
         image_path: Path to source image
         output_dir: Output directory for tiles (parent of object_id directory)
         object_id: Identifier for this object
         base_url: Base URL for the site
+        image_memory_limit: Bytes an image may take decoded whole (None for no limit)
+        metadata: The object's record from objects.json, for the manifest
+        encoding: Tile encoding settings (see tile_encoding)
     """
-    from iiif.static import IIIFStatic
     from PIL import Image
-    import tempfile
 
-    # Preprocess PNG images with transparency (RGBA) to RGB
-    # because IIIF library saves as JPEG which doesn't support alpha
-    processed_image_path = image_path
-    temp_file = None
+    tiles_dir = output_dir
+    base_id = f"{base_url}/iiif/objects/{object_id}"
+    encoding = encoding or tile_encoding()
+    tile_options = (TILE_SIZE, encoding['quality'], encoding['formats'], encoding['progressive'])
+    base_size = encoding.get('base_image_size')
 
-    try:
-        img = Image.open(image_path)
-        if img.mode == 'RGBA':
-            print(f"  ⚠️  Converting RGBA to RGB (removing transparency)")
-            # Create RGB image with white background
-            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-            rgb_img.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-            rgb_img.save(temp_file.name, 'JPEG', quality=95)
-            processed_image_path = Path(temp_file.name)
-            temp_file.close()
-    except Exception as e:
-        print(f"  ⚠️  Error preprocessing image: {e}")
-        # Continue with original image
+    with Image.open(image_path) as img:
+        width, height = img.size
 
-    # Note: iiif library creates a subdirectory with the identifier name
-    # We pass the parent directory, and it creates parent_dir/object_id/
-    parent_dir = output_dir.parent
-    tiles_dir = parent_dir / object_id
+        base_pixels = None
+        if image_memory_limit and decode_memory(img) > image_memory_limit:
+            base_pixels = image_memory_limit // (3 * DECODE_MEMORY_FACTOR)
+            reader = band_reader(image_path)
+            if reader:
+                print(f"  Tiling in bands ({width}x{height} is over the image memory limit)")
+                if base_size:
+                    # Only keep the smallest level the capped base image can be scaled from
+                    level_width, level_height = level_size(width, height, base_image_level(width, height, base_size))
+                    base_pixels = min(base_pixels, level_width * level_height)
+                _, base = generate_tiles_from_bands(reader.bands(TILE_SIZE), reader.size, tiles_dir, base_id,
+                                                    *tile_options, base_pixels=base_pixels, max_full_size=FULL_SIZE_MAX)
+                save_base_image(fit_base_image(base, max_size=base_size), tiles_dir, object_id,
+                                encoding['progressive'])
+                create_manifest(tiles_dir, object_id, base_url, width, height, metadata)
+                return
+            print(f"  ⚠️  Image is over the memory limit but can't be read in bands; decoding it whole")
+
+        # Tiles are JPEG, so transparency is flattened onto white and other
+        # modes converted, once for both the tiles and the base image
+        image = normalize_mode(img)
+        if image.mode != img.mode:
+            print(f"  Converting {img.mode} to {image.mode}" + (" (removing transparency)" if 'A' in img.mode else ""))
+
+        generate_tiles(image, tiles_dir, base_id, *tile_options, max_full_size=FULL_SIZE_MAX)
 
-    try:
-        # Create static generator
-        # Note: iiif library appends the identifier to the prefix, so we use objects/ not objects/object_id/
-        sg = IIIFStatic(
-            dst=str(parent_dir),
-            prefix=f"{base_url}/iiif/objects",  # iiif library will append /{identifier}
-            tilesize=512,
-            api_version='3.0'
-        )
-
-        # Generate tiles (this creates parent_dir/object_id/)
-        sg.generate(src=str(processed_image_path), identifier=object_id)
-
-        # Copy full-resolution image for UniversalViewer BEFORE cleaning up temp file
         # UniversalViewer expects a base image at the path declared in the manifest
-        copy_base_image(processed_image_path, tiles_dir, object_id)
-    finally:
-        # Clean up temporary file if created
-        if temp_file and Path(temp_file.name).exists():
-            Path(temp_file.name).unlink()
+        if base_pixels or (base_size and max(width, height) > base_size):
+            save_base_image(fit_base_image(image, base_pixels, base_size), tiles_dir, object_id,
+                            encoding['progressive'])
+        elif is_plain_jpeg(img):
+            copy_base_image(image_path, tiles_dir, object_id)
+        else:
+            save_base_image(image, tiles_dir, object_id, encoding['progressive'])
 
     # Create manifest wrapper for UniversalViewer
-    create_manifest(tiles_dir, object_id, image_path, base_url)
+    create_manifest(tiles_dir, object_id, base_url, width, height, metadata)
+
+def base_image_level(width, height, max_size):
+    """Smallest pyramid level whose longest side is still at least max_size (0 for smaller images)"""
+    level = 0
+    while max(level_size(width, height, level + 1)) >= max_size:
+        level += 1
+    return level
+
+def fit_base_image(image, max_pixels=None, max_size=None):
+    """
+    Scale an image down for use as the base image
+
+    Args:
+        image: Decoded image or pyramid level, in L or RGB mode
+        max_pixels: Reduce by powers of two to at most this many pixels
+        max_size: Then resize to at most this many pixels on the longest side
+
+    Returns:
+        The scaled image (the same image if it already fits)
+    """
+    from PIL import Image
+
+    if max_pixels:
+        level = largest_level_within(image.width, image.height, max_pixels)
+        if level:
+            image = image.reduce(2 ** level)
+    if max_size and max(image.size) > max_size:
+        scale = max_size / max(image.size)
+        size = (max(round(image.width * scale), 1), max(round(image.height * scale), 1))
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    return image
+
+def base_image_size(output_dir, object_id):
+    """(width, height) of an object's base image, or None if it has none"""
+    from PIL import Image
+
+    try:
+        with Image.open(output_dir / f"{object_id}.jpg") as base:
+            return base.size
+    except Exception:
+        return None
+
+def is_plain_jpeg(img):
+    """
+    Whether a source image can be used as the base image byte for byte
+
+    That is a baseline RGB or greyscale JPEG without an EXIF rotation,
+    which browsers would apply to the base image but the tiler doesn't
+    apply to the tiles.
+    """
+    return (
+        img.format == 'JPEG'
+        and img.mode in ('RGB', 'L')
+        and not img.info.get('progressive')
+        and img.getexif().get(EXIF_ORIENTATION, 1) == 1
+    )
 
 def copy_base_image(source_image_path, output_dir, object_id):
     """
-    Copy the full-resolution image to the location expected by UniversalViewer
+    Copy the source image to the location expected by UniversalViewer
 
     UniversalViewer tries to load the base image at {object_id}/{object_id}.jpg
     which is declared in the manifest body.id. IIIF Level 0 doesn't automatically
-    create this file, so we copy it manually.
+    create this file, so we copy it manually. Only used for sources that
+    are already plain JPEGs (see is_plain_jpeg) within the base image size
+    cap; others go through save_base_image.
 
     Args:
-        source_image_path: Path to the processed source image
+        source_image_path: Path to the source JPEG
         output_dir: Output directory for IIIF tiles
         object_id: Object identifier
     """
-    from PIL import Image
-
-    dest_path = output_dir / f"{object_id}.jpg"
-
     try:
-        # Open and save as JPEG (in case source was PNG or other format)
-        img = Image.open(source_image_path)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Convert to RGB if necessary
-            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            if img.mode in ('RGBA', 'LA'):
-                rgb_img.paste(img, mask=img.split()[-1])  # Use alpha channel as mask
-            img = rgb_img
-
-        img.save(dest_path, 'JPEG', quality=95)
+        shutil.copyfile(source_image_path, output_dir / f"{object_id}.jpg")
         print(f"  ✓ Copied base image to {object_id}.jpg")
     except Exception as e:
         print(f"  ⚠️  Error copying base image: {e}")
 
-def create_manifest(output_dir, object_id, image_path, base_url):
+def save_base_image(image, output_dir, object_id, progressive=False):
     """
-    Create IIIF Presentation API manifest for UniversalViewer
+    Encode the base image from the decoded source or a pyramid level
 
     Args:
-        output_dir: Directory containing info.json
+        image: PIL image, already in L or RGB mode
+        output_dir: Output directory for IIIF tiles
         object_id: Object identifier
-        image_path: Original image path
-        base_url: Base URL for the site
+        progressive: Write a progressive JPEG
     """
-    from PIL import Image
-
-    # Read info.json to get image dimensions
-    info_path = output_dir / 'info.json'
-    if not info_path.exists():
-        print(f"  ⚠️  info.json not found, skipping manifest creation")
-        return
+    try:
+        image.save(output_dir / f"{object_id}.jpg", 'JPEG', quality=BASE_IMAGE_QUALITY, progressive=progressive)
+        print(f"  ✓ Saved {image.width}x{image.height} base image to {object_id}.jpg")
+    except Exception as e:
+        print(f"  ⚠️  Error saving base image: {e}")
 
-    with open(info_path, 'r') as f:
+def read_tiled_size(object_output):
+    """(width, height) recorded in an object's info.json"""
+    with open(object_output / 'info.json', 'r') as f:
         info = json.load(f)
+    return info.get('width', 0), info.get('height', 0)
+
+def create_manifest(output_dir, object_id, base_url, width, height, metadata=None):
+    """
+    Create IIIF Presentation API manifest for UniversalViewer
 
-    width = info.get('width', 0)
-    height = info.get('height', 0)
+    The painting body is the base image, at its own (possibly capped) size;
+    the canvas and the image service have the full size.
 
-    # Load metadata from objects.json if available
-    metadata = load_object_metadata(object_id)
+    Args:
+        output_dir: Directory containing info.json
+        object_id: Object identifier
+        base_url: Base URL for the site
+        width: Width of the full image
+        height: Height of the full image
+        metadata: The object's record from objects.json (see load_object_index)
+    """
+    metadata = metadata or {}
+    body_width, body_height = base_image_size(output_dir, object_id) or (width, height)
 
     # Create IIIF Presentation v3 manifest
     manifest = {
@@ -186,8 +331,8 @@ def create_manifest(output_dir, object_id, image_path, base_url):
                                     "id": f"{base_url}/iiif/objects/{object_id}/{object_id}.jpg",
                                     "type": "Image",
                                     "format": "image/jpeg",
-                                    "height": height,
-                                    "width": width,
+                                    "height": body_height,
+                                    "width": body_width,
                                     "service": [
                                         {
                                             "id": f"{base_url}/iiif/objects/{object_id}",
@@ -206,16 +351,19 @@ def create_manifest(output_dir, object_id, image_path, base_url):
     }
 
     # Add metadata fields
-    if metadata.get('creator'):
-        manifest['metadata'].append({
-            "label": {"en": ["Creator"]},
-            "value": {"en": [metadata['creator']]}
-        })
-    if metadata.get('period'):
-        manifest['metadata'].append({
-            "label": {"en": ["Period"]},
-            "value": {"en": [metadata['period']]}
-        })
+    for field, label in MANIFEST_METADATA_FIELDS:
+        if metadata.get(field):
+            manifest['metadata'].append({
+                "label": {"en": [label]},
+                "value": {"en": [str(metadata[field])]}
+            })
+
+    # Credit line, shown by viewers as the attribution
+    if metadata.get('credit'):
+        manifest['requiredStatement'] = {
+            "label": {"en": ["Credit"]},
+            "value": {"en": [str(metadata['credit'])]}
+        }
 
     # Write manifest
     manifest_path = output_dir / 'manifest.json'
@@ -224,21 +372,574 @@ def create_manifest(output_dir, object_id, image_path, base_url):
 
     print(f"  ✓ Created manifest.json")
 
-def load_object_metadata(object_id):
-    """Load metadata for an object from objects.json"""
+def load_object_index(objects_json=OBJECTS_JSON):
+    """
+    Load objects.json once as a dict keyed by object_id
+
+    Returns:
+        dict mapping object_id to its record, empty if the file is missing
+        or can't be read
+    """
     try:
-        objects_json = Path('_data/objects.json')
+        objects_json = Path(objects_json)
         if objects_json.exists():
             with open(objects_json, 'r') as f:
-                objects = json.load(f)
-                for obj in objects:
-                    if obj.get('object_id') == object_id:
-                        return obj
+                return {obj['object_id']: obj for obj in json.load(f) if obj.get('object_id')}
     except Exception as e:
-        print(f"  ⚠️  Could not load metadata: {e}")
+        print(f"⚠️  Could not load object metadata: {e}")
     return {}
 
-def generate_iiif_tiles(source_dir='components/images/objects', output_dir='iiif/objects', base_url=None):
+def load_story_references(data_dir='_data'):
+    """
+    Object IDs shown by any story or chapter step
+
+    Returns:
+        set of object IDs from the 'object' column of every
+        story-*.json and chapter-*.json in the data directory
+    """
+    references = set()
+    for story_json in story_data_files(data_dir):
+        try:
+            with open(story_json, 'r') as f:
+                steps = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Could not load {story_json}: {e}")
+            continue
+        for step in steps:
+            object_id = str(step.get('object', '')).strip() if isinstance(step, dict) else ''
+            if object_id:
+                references.add(object_id)
+    return references
+
+def select_referenced_images(images, object_index, story_references):
+    """
+    Split source images into those the site shows from local tiles and the rest
+
+    An image is used when its object is listed in objects.json or shown by
+    a story step, unless objects.json gives it an external iiif_manifest
+    (the viewer loads that instead).
+
+    Args:
+        images: List of (object_id, image_file) tuples
+        object_index: objects.json records by object_id
+        story_references: Object IDs used by story steps
+
+    Returns:
+        (used images, unused images) tuple; unused entries are
+        (object_id, image_file, reason) tuples
+    """
+    used = []
+    unused = []
+    for object_id, image_file in images:
+        record = object_index.get(object_id)
+        if record is None and object_id not in story_references:
+            unused.append((object_id, image_file, 'not in objects.json or any story'))
+        elif record is not None and str(record.get('iiif_manifest', '')).strip():
+            unused.append((object_id, image_file, 'has an external IIIF manifest'))
+        else:
+            used.append((object_id, image_file))
+    return used, unused
+
+def write_thumbnails(results, output_path, object_index, thumbnail_dir, thumbnail_format='jpg',
+                     cache_dir=THUMBNAIL_CACHE_DIR):
+    """
+    Write a thumbnail for every tiled object and every external IIIF object
+
+    Thumbnails are made once per source image (or manifest URL) and kept in
+    the thumbnail cache; each run copies them to {object_id}.{format} in
+    the thumbnail directory, and removes the ones objects.json records from
+    an earlier run that this run no longer writes. Other files in the
+    directory are left alone. When a thumbnail can't be made, the one
+    already in the thumbnail directory (if any) is kept.
+
+    Args:
+        results: tile_object results; successful ones get a thumbnail
+        output_path: Directory holding every object's tiles
+        object_index: objects.json records by object_id, for external manifests
+        thumbnail_dir: Directory the thumbnails are written to
+        thumbnail_format: 'jpg' or 'webp'
+        cache_dir: Thumbnail cache directory
+
+    Returns:
+        (thumbnails, stats) tuple: dict of object_id to the thumbnail's URL
+        path, and dict with made, cached, failed and keys (cache keys in use)
+    """
+    settings = thumbnail_settings(thumbnail_format)
+    cache = ThumbnailCache(cache_dir)
+    thumbnail_dir = Path(thumbnail_dir)
+    thumbnail_dir.mkdir(parents=True, exist_ok=True)
+
+    # (object_id, cache source, manifest URL or None)
+    sources = []
+    for result in results:
+        stamp = read_stamp(output_path / result['object_id']) if result['success'] else None
+        if stamp:
+            sources.append((result['object_id'], stamp['sha256'], None))
+    tiled = {object_id for object_id, _, _ in sources}
+    for object_id, record in sorted(object_index.items()):
+        manifest_url = str(record.get('iiif_manifest', '')).strip()
+        if manifest_url and object_id not in tiled:
+            sources.append((object_id, manifest_url, manifest_url))
+
+    thumbnails = {}
+    stats = {'made': 0, 'cached': 0, 'failed': 0, 'keys': set()}
+    for object_id, source, manifest_url in sources:
+        key = ThumbnailCache.key(source, settings)
+        stats['keys'].add(key)
+        cached = cache.path(key, settings)
+        name = f"{object_id}.{thumbnail_format}"
+        if cached.exists():
+            stats['cached'] += 1
+        else:
+            try:
+                if manifest_url:
+                    image = fetch_external_thumbnail(manifest_url)
+                else:
+                    image = thumbnail_from_tiles(output_path / object_id, object_id)
+                save_thumbnail(image, cached, thumbnail_format)
+                stats['made'] += 1
+            except Exception as e:
+                stats['failed'] += 1
+                # A failure may be transient (a timeout, a 5xx); keep the
+                # thumbnail an earlier run wrote rather than drop it
+                if (thumbnail_dir / name).exists():
+                    print(f"  ⚠️  Could not make a thumbnail for {object_id}, keeping the previous one: {e}")
+                    thumbnails[object_id] = f"{THUMBNAIL_URL_PATH}/{name}"
+                else:
+                    print(f"  ⚠️  Could not make a thumbnail for {object_id}: {e}")
+                continue
+        shutil.copyfile(cached, thumbnail_dir / name)
+        thumbnails[object_id] = f"{THUMBNAIL_URL_PATH}/{name}"
+
+    # Only files named like a thumbnail an earlier run recorded, so a
+    # thumbnail directory shared with other files keeps them
+    written = {Path(path).name for path in thumbnails.values()}
+    recorded = {f"{object_id}.{extension}"
+                for object_id, record in object_index.items()
+                if str(record.get('thumbnail') or '').startswith(f"{THUMBNAIL_URL_PATH}/")
+                for extension in ('jpg', 'webp')}
+    for name in recorded - written:
+        if (thumbnail_dir / name).is_file():
+            (thumbnail_dir / name).unlink()
+
+    return thumbnails, stats
+
+def update_object_thumbnails(thumbnails, objects_json=OBJECTS_JSON):
+    """
+    Write generated thumbnail paths into objects.json
+
+    Objects with a thumbnail of their own keep it; generated paths of
+    objects that no longer have a thumbnail are cleared. If csv_to_json.py
+    recorded objects.json as up to date, its record is moved to the updated
+    file, so the objects aren't reconverted just because of the thumbnails.
+
+    Returns:
+        Number of objects whose thumbnail changed
+    """
+    objects_json = Path(objects_json)
+    if not objects_json.exists():
+        return 0
+    previous_hash = hash_file(objects_json)
+    with open(objects_json, 'r', encoding='utf-8') as f:
+        objects = json.load(f)
+
+    changed = 0
+    for obj in objects:
+        current = str(obj.get('thumbnail') or '').strip()
+        if current and not current.startswith(f"{THUMBNAIL_URL_PATH}/"):
+            continue
+        thumbnail = thumbnails.get(obj.get('object_id'), '')
+        if thumbnail != current:
+            obj['thumbnail'] = thumbnail
+            changed += 1
+    if not changed:
+        return 0
+
+    with open(objects_json, 'w', encoding='utf-8') as f:
+        json.dump(objects, f, indent=2, ensure_ascii=False)
+
+    state = BuildState.load(DEFAULT_STATE_PATH)
+    entry = state.get(objects_json)
+    if entry and entry.get('output') == previous_hash:
+        entry['output'] = hash_file(objects_json)
+        state.save()
+    return changed
+
+def generator_version():
+    """Hash of the tiling code and the Pillow version"""
+    import PIL
+
+    scripts_dir = Path(__file__).parent
+    parts = [hash_file(scripts_dir / name) or '' for name in GENERATOR_MODULES]
+    parts.append(PIL.__version__)
+    return hash_bytes('\n'.join(parts).encode('utf-8'))
+
+def tile_settings(base_url, encoding=None):
+    """Everything besides the source image that the tiles depend on"""
+    return {
+        'tilesize': TILE_SIZE,
+        'api_version': IIIF_API_VERSION,
+        'base_url': base_url,
+        'encoding': encoding or tile_encoding(),
+        'generator': generator_version()
+    }
+
+def store_settings(encoding=None):
+    """The tile settings that identify a tile store entry (all but the base URL)"""
+    settings = tile_settings(None, encoding)
+    del settings['base_url']
+    return settings
+
+def read_stamp(object_output):
+    """An object's build stamp, or None if it has none"""
+    try:
+        with open(object_output / STAMP_FILENAME, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_stamp(object_output, image_file, base_url, content_hash=None, encoding=None):
+    """
+    Record the source image and settings an object's tiles were built from
+
+    Args:
+        object_output: The object's tile directory
+        image_file: Source image
+        base_url: Base URL the tiles were generated for
+        content_hash: SHA-256 of the source, if already known
+        encoding: Tile encoding settings the tiles were written with
+    """
+    stat = image_file.stat()
+    stamp = {
+        'source': image_file.name,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'sha256': content_hash or hash_file(image_file)
+    }
+    stamp.update(tile_settings(base_url, encoding))
+    with open(object_output / STAMP_FILENAME, 'w') as f:
+        json.dump(stamp, f, indent=2)
+
+def is_up_to_date(object_output, image_file, base_url, encoding=None):
+    """
+    Whether an object's tiles were built from this image with these settings
+
+    The source's size and mtime are compared first; only if the mtime
+    differs (e.g. after a fresh checkout) is the content hashed, and a
+    matching hash refreshes the stamp.
+    """
+    stamp = read_stamp(object_output)
+    if stamp is None:
+        return False
+
+    if not (object_output / 'info.json').exists():
+        return False
+    if any(stamp.get(key) != value for key, value in tile_settings(base_url, encoding).items()):
+        return False
+
+    stat = image_file.stat()
+    if stamp.get('source') != image_file.name or stamp.get('size') != stat.st_size:
+        return False
+    if stamp.get('mtime') == stat.st_mtime_ns:
+        return True
+
+    content_hash = hash_file(image_file)
+    if stamp.get('sha256') != content_hash:
+        return False
+    write_stamp(object_output, image_file, base_url, content_hash, encoding)
+    return True
+
+def prune_orphans(output_path, object_ids):
+    """
+    Remove stamped object directories whose source image no longer exists
+
+    Only directories with a build stamp are removed, so anything not
+    generated by this script is left alone.
+
+    Returns:
+        List of removed object IDs
+    """
+    removed = []
+    for entry in sorted(output_path.iterdir()):
+        if entry.is_dir() and entry.name not in object_ids and (entry / STAMP_FILENAME).exists():
+            shutil.rmtree(entry)
+            removed.append(entry.name)
+    return removed
+
+# Decoding needs width × height × bands bytes; tiling also keeps an RGB
+# copy of transparent images and the downscaled pyramid levels around
+DECODE_MEMORY_FACTOR = 2
+
+# Images estimated to need more than this are read in bands (about 180
+# megapixels of RGB, where Pillow's decompression bomb check used to stop)
+DEFAULT_IMAGE_MEMORY_MB = 1024
+
+def decode_memory(img):
+    """Estimated bytes needed to tile an opened (not yet decoded) image"""
+    return img.width * img.height * max(len(img.getbands()), 3) * DECODE_MEMORY_FACTOR
+
+def estimate_image_memory(image_path, image_memory_limit=None):
+    """
+    Estimate the bytes needed to tile an image, from its header only
+
+    Args:
+        image_path: Path to the source image
+        image_memory_limit: If given, images over it that can be read in
+                            bands are counted at the limit
+
+    Returns:
+        Estimated bytes, or 0 if the image can't be read (the worker reports the error)
+    """
+    from PIL import Image
+
+    allow_large_images()
+    try:
+        with Image.open(image_path) as img:
+            estimate = decode_memory(img)
+    except Exception:
+        return 0
+    if image_memory_limit and estimate > image_memory_limit and band_reader(image_path):
+        return image_memory_limit
+    return estimate
+
+def default_memory_budget():
+    """Half of the physical memory in MB, or 4096 MB if it can't be determined"""
+    try:
+        total = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        return max(total // 2 // (1024 * 1024), 1)
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+def tile_object(object_id, image_file, output_path, base_url, progress='', force=False, image_memory_limit=None,
+                metadata=None, encoding=None, tile_store=None):
+    """
+    Generate tiles and manifest for one object, replacing any previous output
+
+    Tiles whose build stamp matches the source image and settings are kept;
+    only the manifest is rewritten, as it depends on objects.json. Otherwise
+    tiles already in the tile store for this source and settings (e.g. from
+    a build for another base URL, or a CI run whose output wasn't kept) are
+    linked from there instead of being generated again.
+
+    Args:
+        object_id: Object identifier
+        image_file: Path to source image
+        output_path: Directory holding every object's tiles
+        base_url: Base URL for the site
+        progress: Position shown in the log, e.g. '[3/16]'
+        force: Retile even if the tiles are up to date
+        image_memory_limit: Bytes above which an image is read in bands
+        metadata: The object's record from objects.json, for the manifest
+        encoding: Tile encoding settings (see tile_encoding)
+        tile_store: Tile store directory, or None not to use one
+
+    Returns:
+        dict with object_id, image, success, skipped, restored, store_key,
+        seconds and error
+    """
+    allow_large_images()
+    start = time.perf_counter()
+    error = None
+    skipped = False
+    restored = False
+    stored = False
+    store_key = None
+    store = TileStore(tile_store) if tile_store else None
+
+    # Output directory for this object
+    object_output = output_path / object_id
+
+    print(f"{progress} Processing {image_file.name}...")
+    print(f"  Object ID: {object_id}")
+
+    try:
+        if not force and is_up_to_date(object_output, image_file, base_url, encoding):
+            skipped = True
+            print(f"  ✓ Tiles are up to date")
+            create_manifest(object_output, object_id, base_url, *read_tiled_size(object_output), metadata)
+            if store:
+                # Tiles from before the store was used are stored as they are
+                store_key = TileStore.key(read_stamp(object_output)['sha256'], store_settings(encoding))
+                stored = store.add(store_key, object_output, object_id, skip={'manifest.json', STAMP_FILENAME})
+            print()
+        else:
+            content_hash = hash_file(image_file)
+            if store:
+                store_key = TileStore.key(content_hash, store_settings(encoding))
+
+            # Remove existing output if present
+            if object_output.exists():
+                shutil.rmtree(object_output)
+
+            if store and not force and store_key in store:
+                # Same source and settings tiled before: only the ids differ
+                info = store.materialise(store_key, object_output, object_id)
+                info['id'] = f"{base_url}/iiif/objects/{object_id}"
+                write_info(info, object_output)
+                create_manifest(object_output, object_id, base_url, info['width'], info['height'], metadata)
+                restored = True
+                print(f"  ✓ Restored tiles for {object_id} from the tile store")
+            else:
+                object_output.mkdir(parents=True, exist_ok=True)
+
+                # Generate IIIF tiles and manifest
+                generate_iiif_for_image(image_file, object_output, object_id, base_url, image_memory_limit, metadata,
+                                        encoding)
+                if store:
+                    stored = store.add(store_key, object_output, object_id, skip={'manifest.json', STAMP_FILENAME})
+                print(f"  ✓ Generated tiles for {object_id}")
+
+            write_stamp(object_output, image_file, base_url, content_hash, encoding)
+            print()
+
+    except Exception as e:
+        error = str(e)
+        print(f"  ❌ Error processing {image_file.name}: {e}")
+        traceback.print_exc()
+        print()
+
+    return {
+        'object_id': object_id,
+        'image': image_file.name,
+        'success': error is None,
+        'skipped': skipped,
+        'restored': restored,
+        'stored': stored,
+        'store_key': store_key,
+        'seconds': time.perf_counter() - start,
+        'error': error
+    }
+
+def tile_object_logged(*args, **kwargs):
+    """
+    Run tile_object in a worker process, capturing its output
+
+    Returns:
+        (result, log text) tuple, so each image's log is printed as one block
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        result = tile_object(*args, **kwargs)
+    return result, log.getvalue()
+
+def tile_objects_parallel(images, output_path, base_url, jobs, memory_budget, force=False, image_memory_limit=None,
+                          object_index=None, encoding=None, tile_store=None):
+    """
+    Tile images in a process pool without exceeding a memory budget
+
+    An image is only started while the estimated memory of the images being
+    tiled, plus its own, fits the budget; an image larger than the whole
+    budget runs on its own. Images that don't fit yet are passed over in
+    favour of later ones that do.
+
+    Args:
+        images: List of (object_id, image_file) tuples
+        output_path: Directory holding every object's tiles
+        base_url: Base URL for the site
+        jobs: Worker processes
+        memory_budget: Estimated bytes allowed in flight
+        force: Retile even if the tiles are up to date
+        image_memory_limit: Bytes above which an image is read in bands
+        object_index: objects.json records by object_id; each worker is
+                      sent only its object's record
+        encoding: Tile encoding settings (see tile_encoding)
+        tile_store: Tile store directory, or None not to use one
+
+    Returns:
+        List of result dicts, in completion order
+    """
+    pending = [
+        (f"[{i}/{len(images)}]", object_id, image_file, estimate_image_memory(image_file, image_memory_limit))
+        for i, (object_id, image_file) in enumerate(images, 1)
+    ]
+    object_index = object_index or {}
+    running = {}
+    in_flight = 0
+    results = []
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for task in list(pending):
+                if len(running) >= jobs:
+                    break
+                memory = task[3]
+                if running and in_flight + memory > memory_budget:
+                    continue
+                pending.remove(task)
+                progress, object_id, image_file, _ = task
+                future = executor.submit(tile_object_logged, object_id, image_file, output_path, base_url, progress, force,
+                                         image_memory_limit, object_index.get(object_id), encoding, tile_store)
+                running[future] = task
+                in_flight += memory
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                progress, object_id, image_file, memory = running.pop(future)
+                in_flight -= memory
+                try:
+                    result, log = future.result()
+                except Exception as e:
+                    # The worker itself failed (e.g. it was killed)
+                    result = {'object_id': object_id, 'image': image_file.name, 'success': False,
+                              'skipped': False, 'restored': False, 'store_key': None, 'seconds': 0.0, 'error': str(e)}
+                    log = f"{progress} Processing {image_file.name}...\n  ❌ Worker failed: {e}\n\n"
+                print(log, end='')
+                results.append(result)
+
+    return results
+
+def print_results(results):
+    """Print one line per image: status, time and any error"""
+    print("Per-image results:")
+    width = max(len(result['object_id']) for result in results)
+    for result in sorted(results, key=lambda result: result['object_id']):
+        status = '✓' if result['success'] else '❌'
+        line = f"  {status} {result['object_id']:<{width}}  {result['seconds']:6.1f}s"
+        if result['skipped']:
+            line += "  unchanged"
+        elif result['restored']:
+            line += "  from tile store"
+        if result['error']:
+            line += f"  {result['error']}"
+        print(line)
+
+def print_unused_images(unused):
+    """List the source images the site doesn't use, so they can be cleaned up"""
+    print(f"\nUnused source images ({len(unused)}, not tiled):")
+    for object_id, image_file, reason in sorted(unused, key=lambda entry: str(entry[1])):
+        print(f"  {image_file}  ({reason})")
+
+def output_size(output_path):
+    """
+    Total bytes of the generated files, by file extension
+
+    Symlinks (the "w,h" size aliases) aren't counted.
+
+    Returns:
+        dict mapping extension (without the dot) to bytes
+    """
+    sizes = {}
+    for root, _, files in os.walk(output_path):
+        for name in files:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                extension = os.path.splitext(name)[1].lstrip('.') or name
+                sizes[extension] = sizes.get(extension, 0) + os.path.getsize(path)
+    return sizes
+
+def format_output_size(sizes):
+    """e.g. '12.3 MB (jpg 10.1 MB, webp 2.2 MB)' for the image formats"""
+    total = sum(sizes.values())
+    formats = ', '.join(
+        f"{extension} {sizes[extension] / 1e6:.1f} MB" for extension in sorted(sizes) if extension in TILE_FORMATS
+    )
+    return f"{total / 1e6:.1f} MB ({formats})" if formats else f"{total / 1e6:.1f} MB"
+
+def generate_iiif_tiles(source_dir='components/images/objects', output_dir='iiif/objects', base_url=None,
+                        jobs=0, memory_budget_mb=None, force=False, image_memory_mb=DEFAULT_IMAGE_MEMORY_MB,
+                        tile_format='jpg', quality=TILE_QUALITY, progressive=False, dedup=False,
+                        tile_store=DEFAULT_STORE_DIR, referenced_only=False, full_base_image=False,
+                        thumbnail_dir=DEFAULT_THUMBNAIL_DIR):
     """
     Generate IIIF tiles for all images in source directory
 
@@ -246,10 +947,38 @@ def generate_iiif_tiles(source_dir='components/images/objects', output_dir='iiif
         source_dir: Directory containing source images
         output_dir: Directory to output IIIF tiles and manifests
         base_url: Base URL for the site
+        jobs: Images to tile in parallel (0 uses one process per CPU)
+        memory_budget_mb: Estimated decode memory allowed across parallel
+                          images, in MB (default: half the physical memory)
+        force: Retile every image, even if its tiles are up to date
+        image_memory_mb: Estimated decode memory above which an image is
+                         read in bands instead of whole, in MB
+        tile_format: Preferred tile format, 'jpg' or 'webp' (written alongside JPEG)
+        quality: Encoder quality of the tiles, 1-100
+        progressive: Write progressive JPEG tiles and base images
+        dedup: Hardlink byte-identical tiles to one copy, across the tile store
+            when this run added to it (or across the output without a store)
+        tile_store: Directory of the content-addressed tile store, or None
+                    to generate every changed image from scratch
+        referenced_only: Only tile images of objects listed in objects.json
+                         or shown by a story step, skipping objects with an
+                         external IIIF manifest, and list the rest
+        full_base_image: Keep the base image at full resolution instead of
+                         capping it at BASE_IMAGE_MAX_SIZE pixels
+        thumbnail_dir: Directory to write object thumbnails to (served at
+                       /iiif/thumbnails), recorded in objects.json; None
+                       to skip thumbnails
     """
     if not check_dependencies():
         return False
 
+    if tile_format == 'webp':
+        from PIL import features
+        if not features.check('webp'):
+            print("❌ This Pillow build can't write WebP; use --tile-format jpg or install Pillow with WebP support")
+            return False
+    encoding = tile_encoding(tile_format, quality, progressive, None if full_base_image else BASE_IMAGE_MAX_SIZE)
+
     source_path = Path(source_dir)
     output_path = Path(output_dir)
 
@@ -271,59 +1000,125 @@ def generate_iiif_tiles(source_dir='components/images/objects', output_dir='iiif
     print(f"Source: {source_dir}")
     print(f"Output: {output_dir}")
     print(f"Base URL: {base_url}")
+    print(f"Tiles: {' + '.join(encoding['formats'])}, quality {quality}" + (", progressive" if progressive else ""))
+    print(f"Base image: {'full resolution' if full_base_image else f'up to {BASE_IMAGE_MAX_SIZE}px'}")
+    print(f"Tile store: {tile_store or 'off'}")
     print("=" * 60)
     print()
 
     # Supported image extensions
     image_extensions = ['.jpg', '.jpeg', '.png', '.tif', '.tiff']
 
-    # Find all images
-    images = [f for f in source_path.iterdir()
-              if f.is_file() and f.suffix.lower() in image_extensions]
+    # Manifest metadata for every object, read once
+    object_index = load_object_index()
+    story_references = load_story_references()
+
+    # Find all images (one per object ID, preferring extensions in the order
+    # above), under the object IDs objects.json and the stories use, which
+    # csv_to_json.py matched to them ignoring case
+    images = list(ObjectImageIndex(source_path, image_extensions).items(set(object_index) | story_references))
 
     if not images:
         print(f"⚠️  No images found in {source_dir}")
         print(f"   Supported formats: {', '.join(image_extensions)}")
         return False
 
-    print(f"Found {len(images)} images to process\n")
+    unused = []
+    if referenced_only and (object_index or story_references):
+        images, unused = select_referenced_images(images, object_index, story_references)
+        print(f"Found {len(images) + len(unused)} images, {len(images)} referenced by the site "
+              f"({len(unused)} unused)\n")
+        if not images:
+            print("⚠️  None of the images are referenced by the site; nothing to tile\n")
+    else:
+        if referenced_only:
+            # Without objects.json nothing counts as referenced; tile everything
+            # rather than prune every object's tiles
+            print("⚠️  No objects.json or story data found (run csv_to_json.py first); tiling every image")
+        print(f"Found {len(images)} images to process\n")
 
-    # Process each image file
-    for i, image_file in enumerate(images, 1):
-        # Get object ID from filename (without extension)
-        object_id = image_file.stem
+    jobs = max(min(jobs if jobs > 0 else os.cpu_count() or 1, len(images)), 1)
+    if memory_budget_mb is None:
+        memory_budget_mb = default_memory_budget()
 
-        # Output directory for this object
-        object_output = output_path / object_id
+    image_memory_limit = image_memory_mb * 1024 * 1024
 
-        print(f"[{i}/{len(images)}] Processing {image_file.name}...")
-        print(f"  Object ID: {object_id}")
+    start = time.perf_counter()
+    if jobs > 1:
+        print(f"Tiling with {jobs} processes (memory budget: {memory_budget_mb} MB)\n")
+        results = tile_objects_parallel(images, output_path, base_url, jobs, memory_budget_mb * 1024 * 1024, force,
+                                        image_memory_limit, object_index, encoding, tile_store)
+    else:
+        results = [
+            tile_object(object_id, image_file, output_path, base_url, f"[{i}/{len(images)}]", force, image_memory_limit,
+                        object_index.get(object_id), encoding, tile_store)
+            for i, (object_id, image_file) in enumerate(images, 1)
+        ]
+    elapsed = time.perf_counter() - start
 
-        try:
-            # Remove existing output if present
-            if object_output.exists():
-                shutil.rmtree(object_output)
+    # Tiles of images that have been removed from the source directory
+    removed = prune_orphans(output_path, {object_id for object_id, _ in images})
+    for object_id in removed:
+        print(f"  ✓ Removed tiles for {object_id} (source image no longer exists)")
+    if removed:
+        print()
 
-            object_output.mkdir(parents=True, exist_ok=True)
+    thumbnail_stats = None
+    thumbnails_updated = 0
+    if thumbnail_dir:
+        thumbnails, thumbnail_stats = write_thumbnails(results, output_path, object_index, thumbnail_dir,
+                                                       encoding['formats'][0])
+        thumbnails_updated = update_object_thumbnails(thumbnails)
 
-            # Generate IIIF tiles and manifest
-            generate_iiif_for_image(image_file, object_output, object_id, base_url)
+    # Per-story lists of objects to open, read by story.js
+    plans_written = write_viewer_plans(object_index, output_path) if Path(OBJECTS_JSON).parent.exists() else 0
 
-            print(f"  ✓ Generated tiles for {object_id}")
-            print()
+    skipped = sum(1 for result in results if result['skipped'])
+    restored = sum(1 for result in results if result['restored'])
+    failed = sum(1 for result in results if not result['success'])
 
-        except Exception as e:
-            print(f"  ❌ Error processing {image_file.name}: {e}")
-            import traceback
-            traceback.print_exc()
-            print()
-            continue
+    # Store entries no current image uses; kept after a failure, since the
+    # failed images' entries aren't known
+    store_pruned = 0
+    if tile_store and not failed:
+        store_pruned = TileStore(tile_store).prune({result['store_key'] for result in results})
+
+    # With a tile store, object directories are hardlinked from it on every
+    # run, so the store (which CI caches) is what gets deduplicated, and
+    # only when this run added to it
+    dedup_stats = None
+    if dedup and tile_store:
+        if any(result['stored'] for result in results):
+            dedup_stats = dedup_tiles(tile_store)
+    elif dedup:
+        dedup_stats = dedup_tiles(output_path)
+    if thumbnail_stats and not failed:
+        ThumbnailCache().prune(thumbnail_stats['keys'])
 
     print("=" * 60)
     print("✓ IIIF generation complete!")
-    print(f"  Generated tiles for {len(images)} objects")
+    print(f"  Processed {len(images)} objects in {elapsed:.1f}s: "
+          f"{len(images) - skipped - restored - failed} tiled, {restored} from tile store, "
+          f"{skipped} unchanged, {failed} failed")
     print(f"  Output directory: {output_dir}")
+    if store_pruned:
+        print(f"  Tile store: removed {store_pruned} unused entries")
+    print(f"  Output size: {format_output_size(output_size(output_path))}")
+    if dedup_stats:
+        print(f"  Tile dedup{' (tile store)' if tile_store else ''}: {format_dedup_report(dedup_stats)}")
+    elif dedup:
+        print("  Tile dedup: skipped (no new tiles in the tile store)")
+    if thumbnail_stats:
+        print(f"  Thumbnails: {thumbnail_stats['made']} made, {thumbnail_stats['cached']} cached, "
+              f"{thumbnail_stats['failed']} failed in {thumbnail_dir}"
+              + (f"; {thumbnails_updated} updated in {OBJECTS_JSON}" if thumbnails_updated else ""))
+    if plans_written:
+        print(f"  Viewer plans: {plans_written} updated")
     print("=" * 60)
+    if results:
+        print_results(results)
+    if unused:
+        print_unused_images(unused)
     return True
 
 def main():
@@ -347,13 +1142,104 @@ def main():
         '--base-url',
         help='Base URL for the site (default: from SITE_URL env or http://localhost:4000/telar)'
     )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=0,
+        help='Images to tile in parallel (default: 0, one process per CPU)'
+    )
+    parser.add_argument(
+        '--max-memory',
+        type=int,
+        help='Estimated decode memory allowed across parallel images, in MB (default: half the physical memory)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Retile every image, even if its tiles are up to date'
+    )
+    parser.add_argument(
+        '--tile-format',
+        choices=sorted(TILE_FORMATS),
+        default='jpg',
+        help='Preferred tile format; webp tiles are written alongside jpg ones and advertised in info.json (default: jpg)'
+    )
+    parser.add_argument(
+        '--quality',
+        type=int,
+        default=TILE_QUALITY,
+        help=f'Encoder quality of the tiles, 1-100 (default: {TILE_QUALITY})'
+    )
+    parser.add_argument(
+        '--progressive',
+        action='store_true',
+        help='Write progressive JPEG tiles and base images, which paint a coarse version first'
+    )
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help='Replace byte-identical tiles with hardlinks to a single copy and report the bytes saved '
+             '(in the tile store, when tiles were added to it; otherwise in the output directory)'
+    )
+    parser.add_argument(
+        '--tile-store',
+        default=DEFAULT_STORE_DIR,
+        help=f'Directory of the content-addressed tile store reused across builds (default: {DEFAULT_STORE_DIR})'
+    )
+    parser.add_argument(
+        '--no-tile-store',
+        action='store_true',
+        help='Generate changed images from scratch without reading or writing the tile store'
+    )
+    parser.add_argument(
+        '--referenced-only',
+        action='store_true',
+        help='Only tile objects listed in _data/objects.json or used by a story step, skip objects with an '
+             'external iiif_manifest, and list unused source images'
+    )
+    parser.add_argument(
+        '--full-base-image',
+        action='store_true',
+        help=f'Keep the base image ({{object_id}}.jpg) at full resolution instead of capping its longest side '
+             f'at {BASE_IMAGE_MAX_SIZE}px'
+    )
+    parser.add_argument(
+        '--thumbnail-dir',
+        default=DEFAULT_THUMBNAIL_DIR,
+        help=f'Directory for object thumbnails, served at {THUMBNAIL_URL_PATH} (default: {DEFAULT_THUMBNAIL_DIR})'
+    )
+    parser.add_argument(
+        '--no-thumbnails',
+        action='store_true',
+        help=f'Don\'t write thumbnails or record them in {OBJECTS_JSON}'
+    )
+    parser.add_argument(
+        '--max-image-memory',
+        type=int,
+        default=DEFAULT_IMAGE_MEMORY_MB,
+        help=f'Estimated decode memory above which an image is read in bands, in MB (default: {DEFAULT_IMAGE_MEMORY_MB})'
+    )
 
     args = parser.parse_args()
+    if not 1 <= args.quality <= 100:
+        parser.error('--quality must be between 1 and 100')
 
     success = generate_iiif_tiles(
         source_dir=args.source_dir,
         output_dir=args.output_dir,
-        base_url=args.base_url
+        base_url=args.base_url,
+        jobs=args.jobs,
+        memory_budget_mb=args.max_memory,
+        force=args.force,
+        image_memory_mb=args.max_image_memory,
+        tile_format=args.tile_format,
+        quality=args.quality,
+        progressive=args.progressive,
+        dedup=args.dedup,
+        tile_store=None if args.no_tile_store else args.tile_store,
+        referenced_only=args.referenced_only,
+        full_base_image=args.full_base_image,
+        thumbnail_dir=None if args.no_thumbnails else args.thumbnail_dir
     )
 
     sys.exit(0 if success else 1)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Build the site search index
+
+Reads the converted objects (_data/objects.json), the stories listed in
+_data/project.json (question, answer and rendered layer text of every
+step) and the glossary terms (components/texts/glossary/*.md), and writes
+an inverted index the search page loads piece by piece:
+
+    assets/search/
+        meta.json            shard list, document count, stopwords, format version
+        terms/{prefix}.json  {"term": [doc, score, doc, score, ...], ...}
+        docs/{n}.json        [[type, title, url, context], ...]
+
+Terms are folded (lowercase, accents removed, so "Perú" matches "peru")
+and sharded by their first PREFIX_LENGTH characters; a shard larger than
+MAX_SHARD_BYTES is split on a longer prefix. The search page only fetches
+the shards whose prefix matches what was typed. Postings list each
+document once, with a score summing the weight of every field the term
+appears in; document numbers are delta-encoded. Document details are kept
+in chunks of DOCS_PER_CHUNK, fetched only for the results shown.
+
+Files are only rewritten when their contents change, and shards and
+chunks that are no longer produced are removed.
+
+Usage:
+    python scripts/generate_search_index.py [--output-dir assets/search]
+"""
+
+import argparse
+import json
+import re
+import sys
+import unicodedata
+from html import unescape
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from viewer_plan import story_data_files
+
+DEFAULT_OUTPUT_DIR = 'assets/search'
+
+# Bumped whenever the file layout changes, so the page can detect stale output
+INDEX_VERSION = 1
+
+PREFIX_LENGTH = 2
+MAX_SHARD_BYTES = 64 * 1024
+DOCS_PER_CHUNK = 50
+
+# A term counts at most this many times per field
+MAX_TERM_COUNT = 3
+
+# Field weights per document type
+OBJECT_FIELDS = {'title': 10, 'object_id': 6, 'creator': 6, 'period': 4, 'medium': 3, 'location': 3, 'description': 2}
+STORY_FIELDS = {'title': 10, 'subtitle': 5, 'question': 5, 'layer_title': 4, 'answer': 2, 'layer_text': 1}
+GLOSSARY_FIELDS = {'title': 10, 'body': 2}
+FIELD_WEIGHTS = {'object': OBJECT_FIELDS, 'story': STORY_FIELDS, 'glossary': GLOSSARY_FIELDS}
+
+# Folded English and Spanish words too common to be worth indexing
+STOPWORDS = frozenset("""
+    an and are as at be but by for from has have in is it its not of on or that the this to was were which with
+    al como con de del el en es esta este las lo los mas para pero por que se sin su sus un una uno y
+""".split())
+
+# Letters that don't decompose into a base letter and an accent
+FOLD_LETTERS = str.maketrans({'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ı': 'i'})
+
+def fold(text):
+    """
+    Lowercase text and strip its diacritics (á -> a, ñ -> n, ü -> u)
+
+    search.js folds queries the same way.
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if unicodedata.category(c) != 'Mn').translate(FOLD_LETTERS)
+
+def strip_html(text):
+    """Plain text of rendered HTML"""
+    return unescape(re.sub(r'<[^>]+>', ' ', text))
+
+def tokenize(text):
+    """Folded search terms of a text, in order, without stopwords and single characters"""
+    return [term for term in re.findall(r'[a-z0-9]+', fold(strip_html(str(text))))
+            if len(term) > 1 and term not in STOPWORDS]
+
+def load_json(path, default):
+    """Read a JSON file, or return default if it's missing or unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        if Path(path).exists():
+            print(f"⚠️  Could not load {path}: {e}")
+        return default
+
+def object_documents(data_dir):
+    """Search documents of the objects in objects.json"""
+    for obj in load_json(Path(data_dir) / 'objects.json', []):
+        object_id = str(obj.get('object_id', '')).strip()
+        if not object_id:
+            continue
+        context = ', '.join(str(obj[key]).strip() for key in ('creator', 'period') if str(obj.get(key, '')).strip())
+        yield {
+            'type': 'object',
+            'title': str(obj.get('title', '')).strip() or object_id,
+            'url': f"/objects/{object_id}/",
+            'context': context,
+            'fields': {field: obj.get(field, '') for field in OBJECT_FIELDS}
+        }
+
+def story_documents(data_dir):
+    """
+    Search documents of the stories in project.json
+
+    Story pages are generated for these only (see generate_collections.py);
+    each story is one document holding the text of all its steps.
+    """
+    project = load_json(Path(data_dir) / 'project.json', [])
+    stories = project[0].get('stories', []) if project and isinstance(project[0], dict) else []
+    data_files = {path.stem: path for path in story_data_files(data_dir)}
+
+    for story in stories:
+        name = f"story-{story.get('number', '')}"
+        if name not in data_files:
+            continue
+        fields = {'title': story.get('title', ''), 'subtitle': story.get('subtitle', '')}
+        texts = {field: [] for field in STORY_FIELDS if field not in fields}
+        for step in load_json(data_files[name], []):
+            if not isinstance(step, dict) or '_metadata' in step:
+                continue
+            texts['question'].append(step.get('question', ''))
+            texts['answer'].append(step.get('answer', ''))
+            for key, value in step.items():
+                if re.fullmatch(r'layer\d+_title', key):
+                    texts['layer_title'].append(value)
+                elif re.fullmatch(r'layer\d+_text', key):
+                    texts['layer_text'].append(value)
+        fields.update({field: ' '.join(str(value) for value in values) for field, values in texts.items()})
+        yield {
+            'type': 'story',
+            'title': str(story.get('title', '')).strip() or name,
+            'url': f"/stories/{name}/",
+            'context': str(story.get('subtitle', '')).strip(),
+            'fields': fields
+        }
+
+def glossary_documents(glossary_dir):
+    """Search documents of the glossary terms (same frontmatter parsing as generate_collections.py)"""
+    for source_file in sorted(Path(glossary_dir).glob('*.md')):
+        content = source_file.read_text(encoding='utf-8')
+        match = re.match(r'^---\s*\n(.*?)\n---\s*\n(.*)$', content, re.DOTALL)
+        if not match:
+            continue
+        term_id_match = re.search(r'term_id:\s*(\S+)', match.group(1))
+        if not term_id_match:
+            continue
+        title_match = re.search(r'title:\s*["\']?(.*?)["\']?\s*$', match.group(1), re.MULTILINE)
+        title = title_match.group(1) if title_match else term_id_match.group(1)
+        yield {
+            'type': 'glossary',
+            'title': title,
+            'url': f"/glossary/{term_id_match.group(1)}/",
+            'context': '',
+            'fields': {'title': title, 'body': match.group(2)}
+        }
+
+def build_postings(documents):
+    """
+    Inverted index of a list of documents
+
+    Returns:
+        dict mapping term to a list of (document number, score), by document number
+    """
+    postings = {}
+    for number, document in enumerate(documents):
+        scores = {}
+        for field, weight in FIELD_WEIGHTS[document['type']].items():
+            counts = {}
+            for term in tokenize(document['fields'].get(field, '')):
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                scores[term] = scores.get(term, 0) + weight * min(count, MAX_TERM_COUNT)
+        for term, score in scores.items():
+            postings.setdefault(term, []).append((number, score))
+    return postings
+
+def encode_postings(entries):
+    """Flat [doc, score, ...] list with each document number stored as the gap from the previous one"""
+    encoded = []
+    previous = 0
+    for number, score in entries:
+        encoded.extend((number - previous, score))
+        previous = number
+    return encoded
+
+def dumps(data):
+    """Compact JSON"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def shard_terms(postings, prefix_length=PREFIX_LENGTH, max_bytes=MAX_SHARD_BYTES):
+    """
+    Group terms into shards by prefix
+
+    A shard over max_bytes is split on one more character, as long as its
+    terms are longer than the prefix.
+
+    Returns:
+        dict mapping prefix to shard document ({term: encoded postings})
+    """
+    groups = {}
+    for term in sorted(postings):
+        groups.setdefault(term[:prefix_length], {})[term] = encode_postings(postings[term])
+
+    shards = {}
+    for prefix, terms in groups.items():
+        longer = any(len(term) > prefix_length for term in terms)
+        if longer and len(terms) > 1 and len(dumps(terms).encode('utf-8')) > max_bytes:
+            shards.update(shard_terms({term: postings[term] for term in terms}, prefix_length + 1, max_bytes))
+        else:
+            shards[prefix] = terms
+    return shards
+
+def write_if_changed(path, contents):
+    """Write a file unless it already holds contents; returns True if written"""
+    path = Path(path)
+    if path.exists() and path.read_text(encoding='utf-8') == contents:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(contents, encoding='utf-8')
+    return True
+
+def remove_stale(directory, keep):
+    """Remove the .json files in a directory whose name isn't in keep"""
+    directory = Path(directory)
+    if not directory.exists():
+        return
+    for path in directory.glob('*.json'):
+        if path.name not in keep:
+            path.unlink()
+
+def collect_documents(data_dir='_data', glossary_dir='components/texts/glossary'):
+    """Every search document: objects, then stories, then glossary terms"""
+    return (list(object_documents(data_dir)) + list(story_documents(data_dir))
+            + list(glossary_documents(glossary_dir)))
+
+def write_search_index(documents, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Write the search index of a list of documents
+
+    Returns:
+        dict with documents, terms, shards, bytes (total size of the index
+        files) and written (files rewritten by this run)
+    """
+    output_dir = Path(output_dir)
+    shards = shard_terms(build_postings(documents))
+
+    files = {}
+    for prefix, terms in shards.items():
+        files[f"terms/{prefix}.json"] = dumps(terms)
+    for start in range(0, len(documents), DOCS_PER_CHUNK):
+        chunk = [[document['type'], document['title'], document['url'], document['context']]
+                 for document in documents[start:start + DOCS_PER_CHUNK]]
+        files[f"docs/{start // DOCS_PER_CHUNK}.json"] = dumps(chunk)
+    files['meta.json'] = dumps({
+        'version': INDEX_VERSION,
+        'documents': len(documents),
+        'docs_per_chunk': DOCS_PER_CHUNK,
+        'stopwords': sorted(STOPWORDS),
+        'shards': sorted(shards)
+    })
+
+    written = sum(write_if_changed(output_dir / name, contents) for name, contents in files.items())
+    for subdir in ('terms', 'docs'):
+        remove_stale(output_dir / subdir, {Path(name).name for name in files if name.startswith(f"{subdir}/")})
+
+    return {
+        'documents': len(documents),
+        'terms': sum(len(terms) for terms in shards.values()),
+        'shards': len(shards),
+        'bytes': sum(len(contents.encode('utf-8')) for contents in files.values()),
+        'written': written
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the site search index')
+    parser.add_argument('--data-dir', default='_data', help='Directory with the converted JSON (default: _data)')
+    parser.add_argument('--glossary-dir', default='components/texts/glossary',
+                        help='Directory with the glossary terms (default: components/texts/glossary)')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help=f'Directory to write the index to (default: {DEFAULT_OUTPUT_DIR})')
+    args = parser.parse_args()
+
+    print("Building search index...")
+    print("-" * 50)
+    stats = write_search_index(collect_documents(args.data_dir, args.glossary_dir), args.output_dir)
+    print(f"✓ Indexed {stats['documents']} documents: {stats['terms']} terms in {stats['shards']} shards, "
+          f"{stats['bytes'] / 1024:.0f} KB ({stats['written']} files written)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Static IIIF Level 0 tiles from a decoded image
+
+Writes the same files, at the same paths, as iiif.static.IIIFStatic with
+the settings generate_iiif.py uses (Image API 3.0, canonical "w," sizes):
+
+    {object_id}/info.json
+    {object_id}/{x},{y},{w},{h}/{sw},/0/default.jpg    region tiles
+    {object_id}/full/{sw},/0/default.jpg               full images (sizes)
+    {object_id}/full/{sw},{sh} -> {sw},                symlinks
+
+Tiles can also be written as WebP (default.webp next to each default.jpg),
+which info.json then lists as the preferred format.
+
+IIIFStatic reopens the source for every tile and scales each one down from
+full resolution. Here the image is decoded once and the pyramid is built
+by successive 2× reductions (Image.reduce), each level cut straight into
+tiles, so each level costs one pass over a quarter of the pixels of the
+level above.
+
+The pyramid is built one row of tiles at a time: each row is reduced into
+half a row of the next level, so only a row of tiles per level has to be
+in memory. The source can therefore be a decoded image or a stream of
+horizontal bands (see image_bands.py), and both give the same tiles.
+"""
+
+import itertools
+import json
+import os
+from pathlib import Path
+
+DEFAULT_TILE_SIZE = 512
+TILE_QUALITY = 75
+IIIF_API_VERSION = '3.0'
+
+# Tile formats by IIIF name, with the Pillow format that writes them
+TILE_FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+
+# Level 0 services must offer JPEG; other formats are written alongside it
+DEFAULT_FORMATS = ('jpg',)
+
+# Deepest level searched for small full-image sizes (as in IIIFStatic)
+MAX_SIZE_LEVELS = 20
+
+def scale_factors(width, height, tilesize):
+    """Scale factors 1, 2, 4, ... up to the first one whose tile covers the whole image"""
+    factors = [1]
+    factor = 1
+    for _ in range(30):
+        factor *= 2
+        if tilesize * factor > width and tilesize * factor > height:
+            break
+        factors.append(factor)
+    return factors
+
+def tile_regions(width, height, tilesize, factor):
+    """
+    Yield ((x, y, w, h), (sw, sh)) for every tile at one scale factor
+
+    The region is in full-resolution pixels; the size is the tile's size
+    in pixels. Tiles are requested by width only ("sw,"), so the height is
+    the one that keeps the region's aspect ratio. Nothing is yielded for a
+    factor whose single tile would cover the whole image.
+    """
+    if factor * tilesize >= width and factor * tilesize >= height:
+        return
+    region_size = tilesize * factor
+    for x in range(0, width, region_size):
+        w = min(region_size, width - x)
+        sw = (w + factor - 1) // factor
+        for y in range(0, height, region_size):
+            h = min(region_size, height - y)
+            yield (x, y, w, h), (sw, scaled_height(w, h, sw))
+
+def scaled_height(width, height, scaled_width):
+    """Height of a "w," request: the one that keeps the aspect ratio, rounded (at least 1 pixel)"""
+    return max(1, int(height * scaled_width / width + 0.5))
+
+def full_sizes(width, height, tilesize, max_size=None):
+    """
+    Yield (level, sw, sh) for each full-image size smaller than a tile
+
+    Size level n is the image scaled by 1/2^n, rounded to the nearest pixel.
+    These are the sizes listed in info.json; the image files are requested
+    by width, so their height comes from scaled_height.
+
+    Args:
+        max_size: If given, list every size up to this many pixels on both
+                  sides instead, so viewers can fetch a sharp overview
+                  larger than one tile in a single request
+    """
+    for level in range(MAX_SIZE_LEVELS):
+        factor = 2 ** level
+        sw = int(width / factor + 0.5)
+        sh = int(height / factor + 0.5)
+        if (sw <= max_size and sh <= max_size) if max_size else (sw < tilesize and sh < tilesize):
+            if sw < 1 or sh < 1:
+                break
+            yield level, sw, sh
+
+def normalize_mode(image):
+    """
+    Convert an image to a mode that can be reduced and saved as JPEG
+
+    Transparent images are flattened onto white; 16-bit greyscale is scaled
+    to 8 bits; bilevel images become greyscale and anything else besides
+    greyscale and RGB becomes RGB.
+    """
+    from PIL import Image
+
+    if image.mode.startswith('I;16'):
+        image = image.convert('I').point(lambda i: i * (1.0 / 256.0))
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    if image.mode in ('RGBA', 'LA'):
+        flat_mode = image.mode[:-1]
+        background = Image.new(flat_mode, image.size, 'white')
+        background.paste(image.convert(flat_mode), mask=image.getchannel('A'))
+        image = background
+    if image.mode == '1':
+        image = image.convert('L')
+    elif image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    return image
+
+def save_tile(image, directory, formats, quality, progressive=False):
+    """
+    Write one tile as default.{format} in each format, creating its directory
+
+    Args:
+        image: The tile
+        directory: The tile's {rotation} directory, e.g. .../{sw},/0
+        formats: IIIF format names (keys of TILE_FORMATS)
+        quality: Encoder quality, 1-100
+        progressive: Write progressive rather than baseline JPEG
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for tile_format in formats:
+        options = {'quality': quality}
+        if tile_format == 'jpg' and progressive:
+            options['progressive'] = True
+        image.save(directory / f"default.{tile_format}", TILE_FORMATS[tile_format], **options)
+
+def image_info(base_id, width, height, tilesize, factors, sizes, formats=DEFAULT_FORMATS):
+    """
+    Build the Level 0 info.json document for a tiled image
+
+    The first of formats is the preferred one; if it isn't JPEG it is
+    listed in preferredFormats so viewers that understand it ask for it.
+    """
+    info = {
+        '@context': 'http://iiif.io/api/image/3/context.json',
+        'extraFormats': ['jpg'] + [tile_format for tile_format in formats if tile_format != 'jpg'],
+        'extraQualities': ['default'],
+        'height': height,
+        'id': base_id,
+        'profile': 'level0',
+        'protocol': 'http://iiif.io/api/image',
+        'sizes': [{'height': sh, 'width': sw} for sw, sh in sizes],
+        'tiles': [{'height': tilesize, 'scaleFactors': factors, 'width': tilesize}],
+        'type': 'ImageService3',
+        'width': width
+    }
+    if formats[0] != 'jpg':
+        info['preferredFormats'] = [formats[0]]
+    return info
+
+def level_size(width, height, level):
+    """Size of a pyramid level: each 2× reduction rounds up"""
+    factor = 2 ** level
+    return (width + factor - 1) // factor, (height + factor - 1) // factor
+
+def largest_level_within(width, height, max_pixels):
+    """First pyramid level with at most max_pixels pixels"""
+    return next(
+        level for level in itertools.count()
+        if level_size(width, height, level)[0] * level_size(width, height, level)[1] <= max(max_pixels, 1)
+    )
+
+def image_bands(image, height):
+    """Yield a decoded image as horizontal bands of at most height rows"""
+    width, total = image.size
+    for top in range(0, total, height):
+        yield image.crop((0, top, width, min(top + height, total)))
+
+def stack_rows(images):
+    """Join images of the same width and mode top to bottom"""
+    from PIL import Image
+
+    if len(images) == 1:
+        return images[0]
+    stacked = Image.new(images[0].mode, (images[0].width, sum(image.height for image in images)))
+    top = 0
+    for image in images:
+        stacked.paste(image, (0, top))
+        top += image.height
+    return stacked
+
+def write_info(info, output_dir):
+    """Write info.json, formatted as IIIFStatic writes it"""
+    with open(Path(output_dir) / 'info.json', 'w') as f:
+        f.write(json.dumps(info, sort_keys=True, indent=2))
+
+def generate_tiles(image, output_dir, base_id, tilesize=DEFAULT_TILE_SIZE, quality=TILE_QUALITY,
+                   formats=DEFAULT_FORMATS, progressive=False, max_full_size=None):
+    """
+    Write the tiles and info.json for one image
+
+    Args:
+        image: Decoded PIL image
+        output_dir: The object's directory (created if needed)
+        base_id: Image service id, e.g. {base_url}/iiif/objects/{object_id}
+        tilesize: Tile width and height in pixels
+        quality: Encoder quality of the tiles
+        formats: Tile formats, preferred first (keys of TILE_FORMATS)
+        progressive: Write progressive rather than baseline JPEG tiles
+        max_full_size: Largest full-image size to write (see full_sizes);
+                       by default only sizes smaller than a tile
+
+    Returns:
+        The info.json document
+    """
+    info, _ = generate_tiles_from_bands(image_bands(image, tilesize), image.size, output_dir, base_id, tilesize, quality,
+                                        formats, progressive, max_full_size=max_full_size)
+    return info
+
+def generate_tiles_from_bands(bands, size, output_dir, base_id, tilesize=DEFAULT_TILE_SIZE, quality=TILE_QUALITY,
+                              formats=DEFAULT_FORMATS, progressive=False, base_pixels=None, max_full_size=None):
+    """
+    Write the tiles and info.json for an image read in horizontal bands
+
+    Only one row of tiles per pyramid level is held in memory; the few
+    levels needed whole (the small full-image sizes and their parents, and
+    the base image level if asked for) are kept as they are built.
+
+    Args:
+        bands: Iterable of PIL images, the image's rows from top to bottom,
+               each tilesize rows high except the last
+        size: (width, height) of the whole image
+        output_dir: The object's directory (created if needed)
+        base_id: Image service id, e.g. {base_url}/iiif/objects/{object_id}
+        tilesize: Tile width and height in pixels (even)
+        quality: Encoder quality of the tiles
+        formats: Tile formats, preferred first (keys of TILE_FORMATS)
+        progressive: Write progressive rather than baseline JPEG tiles
+        base_pixels: If given, also return the largest pyramid level with
+                     at most this many pixels
+        max_full_size: Largest full-image size to write (see full_sizes);
+                       by default only sizes smaller than a tile
+
+    Returns:
+        (info.json document, base level image or None) tuple
+    """
+    from PIL import Image
+
+    if tilesize % 2:
+        raise ValueError(f"Tile size must be even, got {tilesize}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    width, height = size
+    factors = scale_factors(width, height, tilesize)
+    sizes_by_level = {level: (sw, sh) for level, sw, sh in full_sizes(width, height, tilesize, max_full_size)}
+
+    base_level = None
+    if base_pixels is not None:
+        base_level = largest_level_within(width, height, base_pixels)
+    last_level = max([len(factors) - 1, base_level or 0] + list(sizes_by_level))
+
+    # Levels kept whole: the full-image sizes are scaled from the level above
+    kept = {level: [] for level in sizes_by_level}
+    kept.update({level - 1: [] for level in sizes_by_level if level > 0})
+    if base_level is not None:
+        kept[base_level] = []
+
+    # Rows of each level not yet cut into tiles, and how many rows have been
+    pending = [[] for _ in range(last_level + 1)]
+    rows_done = [0] * (last_level + 1)
+
+    def tile_row(level, rows):
+        """Cut one row of tiles from a level and pass its reduction down"""
+        factor = 2 ** level
+        if level < len(factors) and not (factor * tilesize >= width and factor * tilesize >= height):
+            y = rows_done[level] * factor
+            h = min(tilesize * factor, height - y)
+            for x in range(0, width, tilesize * factor):
+                w = min(tilesize * factor, width - x)
+                size = ((w + factor - 1) // factor, scaled_height(w, h, (w + factor - 1) // factor))
+                left = x // factor
+                tile = rows.crop((left, 0, left + size[0], (h + factor - 1) // factor))
+                # Rounding the aspect ratio can make an edge tile a pixel off the level's size
+                if tile.size != size:
+                    tile = tile.resize(size)
+                save_tile(tile, output_dir / f"{x},{y},{w},{h}" / f"{size[0]}," / '0', formats, quality, progressive)
+
+        if level in kept:
+            kept[level].append(rows)
+        rows_done[level] += rows.height
+        if level < last_level:
+            # Each level is half the one above, rounded up
+            add_rows(level + 1, rows.reduce(2))
+
+    def add_rows(level, rows):
+        pending[level].append(rows)
+        while sum(image.height for image in pending[level]) >= tilesize:
+            stacked = stack_rows(pending[level])
+            pending[level] = []
+            if stacked.height > tilesize:
+                pending[level].append(stacked.crop((0, tilesize, stacked.width, stacked.height)))
+                stacked = stacked.crop((0, 0, stacked.width, tilesize))
+            tile_row(level, stacked)
+
+    for band in bands:
+        add_rows(0, normalize_mode(band))
+
+    # The last, shorter row of each level
+    for level in range(last_level + 1):
+        if pending[level]:
+            rows = stack_rows(pending[level])
+            pending[level] = []
+            tile_row(level, rows)
+
+    full_dir = output_dir / 'full'
+    for level, (sw, sh) in sizes_by_level.items():
+        size = (sw, scaled_height(width, height, sw))
+        # Scaled from the level above, which is sharper than nudging
+        # this level by a pixel
+        parent = stack_rows(kept[max(level - 1, 0)])
+        small = parent.resize(size, Image.LANCZOS)
+        save_tile(small, full_dir / f"{sw}," / '0', formats, quality, progressive)
+
+        # Also answer the non-canonical "w,h" form, as IIIFStatic does
+        link = full_dir / f"{sw},{sh}"
+        if link.is_symlink() or link.exists():
+            link.unlink()
+        os.symlink(f"{sw},", link)
+
+    info = image_info(base_id, width, height, tilesize, factors, list(sizes_by_level.values()), formats)
+    write_info(info, output_dir)
+
+    base = stack_rows(kept[base_level]) if base_level is not None else None
+    return info, base
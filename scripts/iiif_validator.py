@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+Validate external IIIF manifests referenced from objects.csv
+
+Manifests are checked concurrently: a thread pool with a global worker count
+plus a per-host cap, so one slow institutional server does not stall the
+rest and no single host receives enough parallel requests to start
+rate-limiting (HTTP 429) the build.
+
+Each manifest costs a single GET. The body is streamed through an
+incremental JSON tokenizer that stops once the top-level @context/type
+keys and the first canvas have been seen, so large newspaper or atlas
+manifests are never downloaded in full.
+
+Used by csv_to_json.py; can also be run directly:
+    python scripts/iiif_validator.py <MANIFEST_URL> [<MANIFEST_URL> ...]
+"""
+
+import codecs
+import json
+import os
+import re
+import ssl
+import sys
+import threading
+import time
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+USER_AGENT = 'Telar/0.3.1-beta (IIIF validator)'
+
+# Defaults for the validation pool (overridable from csv_to_json.py)
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 2
+
+# Persistent validation cache (restored between CI runs)
+DEFAULT_CACHE_PATH = '.telar-cache/iiif-manifests.json'
+DEFAULT_CACHE_TTL_HOURS = 24 * 7
+CACHE_VERSION = 2
+
+# Bytes read per network chunk when streaming a manifest
+PROBE_CHUNK_SIZE = 16 * 1024
+
+# Warnings shown on the site (object_warning / object_warning_short columns)
+WARNING_INVALID_URL = "the IIIF manifest URL you specified in your configuration CSV or Google Sheet is not valid"
+WARNING_NOT_MANIFEST = "the IIIF manifest URL you specified in your configuration CSV or Google Sheet does not point to a valid IIIF manifest"
+WARNING_BAD_FORMAT = "the IIIF manifest you specified in your configuration CSV or Google Sheet is not properly formatted"
+WARNING_UNREACHABLE = "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be reached"
+WARNING_UNVALIDATED = "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be validated"
+
+HTTP_WARNINGS = {
+    404: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet does not exist (error 404)",
+        "Error 404: manifest not found"
+    ),
+    429: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 429). Error 429 means \"Too Many Requests\": the IIIF server is rate-limiting your site because you've been requesting this manifest too many times during development/testing, so their server is temporarily blocking your requests. This will likely resolve itself in 15-30 minutes. Try rebuilding your site later – the issue will likely go away.",
+        "Error 429: rate limiting (try again in 15-30 minutes)"
+    ),
+    403: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 403). Error 403 means \"Forbidden\": the IIIF server is blocking access to this manifest. This usually means the manifest requires authentication, has IP restrictions, or is not publicly available. Contact the institution to confirm the manifest can be accessed publicly, or use a different IIIF resource.",
+        "Error 403: access forbidden (likely requires authentication or has IP restrictions)"
+    ),
+    401: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 401). Error 401 means \"Unauthorized\": this manifest requires authentication to access. Telar does not support authenticated IIIF manifests. You'll need to use a publicly accessible IIIF manifest instead.",
+        "Error 401: authentication required (not supported by Telar)"
+    ),
+    500: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 500). Error 500 means \"Internal Server Error\": the IIIF server is experiencing technical problems. This is not a problem with your configuration - the institution's server is having issues. Try rebuilding your site later to see if the issue has been resolved.",
+        "Error 500: server error (try again later)"
+    ),
+    503: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 503). Error 503 means \"Service Unavailable\": the IIIF server is temporarily unavailable, possibly due to maintenance or being overloaded. This is not a problem with your configuration. Try rebuilding your site later - the server should come back online.",
+        "Error 503: server temporarily unavailable (try again later)"
+    ),
+    502: (
+        "the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error 502). Error 502 means \"Bad Gateway\": there's a problem with the IIIF server's infrastructure. This is not a problem with your configuration - the institution's server is having connectivity issues. Try rebuilding your site later to see if the issue has been resolved.",
+        "Error 502: server connectivity issue (try again later)"
+    ),
+}
+
+def create_ssl_context():
+    """
+    Create SSL context that doesn't verify certificates (avoid false positives
+    from institutional servers with incomplete certificate chains)
+    """
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+def validate_manifest(manifest_url, ssl_context=None, cached=None):
+    """
+    Validate a single IIIF manifest URL
+
+    Args:
+        manifest_url: URL of the manifest
+        ssl_context: Optional SSL context to reuse across requests
+        cached: Optional expired cache entry for this URL. Its ETag and
+                Last-Modified values are sent as If-None-Match /
+                If-Modified-Since, and on 304 Not Modified the cached
+                outcome is returned with status unchanged.
+
+    Returns:
+        dict with keys:
+            status: 'valid', 'invalid_url', 'not_json', 'bad_format',
+                    'invalid_json', 'http_error', 'unreachable' or 'error'
+            warning: Long warning for object_warning ('' when valid)
+            warning_short: Short warning for object_warning_short (or None)
+            detail: Extra information for log messages (content type,
+                    HTTP code, network error reason, exception text)
+            content_type, etag, last_modified: Response headers, when the
+                    server answered
+            canvas: For valid manifests, dict with the first canvas's
+                    'width', 'height' and image 'service' id (each may be
+                    None when the manifest doesn't provide it)
+            not_modified: True when the cached entry was revalidated
+    """
+    parsed = urlparse(manifest_url)
+    if parsed.scheme not in ['http', 'https']:
+        return _result('invalid_url', WARNING_INVALID_URL)
+
+    if ssl_context is None:
+        ssl_context = create_ssl_context()
+
+    try:
+        # A single GET: headers are checked first, then the body is streamed
+        # only as far as needed (see ManifestProbe)
+        req = urllib.request.Request(manifest_url)
+        req.add_header('User-Agent', USER_AGENT)
+        if cached:
+            if cached.get('etag'):
+                req.add_header('If-None-Match', cached['etag'])
+            if cached.get('last_modified'):
+                req.add_header('If-Modified-Since', cached['last_modified'])
+
+        with urllib.request.urlopen(req, timeout=10, context=ssl_context) as response:
+            headers = {
+                'content_type': response.headers.get('Content-Type', ''),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+
+            # Check if response is JSON
+            # Don't clear manifest URL - might still work despite wrong content type
+            if 'json' not in headers['content_type'].lower():
+                return _result('not_json', WARNING_NOT_MANIFEST, detail=headers['content_type'], **headers)
+
+            probe = ManifestProbe()
+            try:
+                while not probe.satisfied:
+                    chunk = response.read(PROBE_CHUNK_SIZE)
+                    if not chunk:
+                        probe.finish()
+                        break
+                    probe.feed(chunk)
+            except ValueError:
+                return _result('invalid_json', WARNING_NOT_MANIFEST, **headers)
+
+        # Check for basic IIIF structure
+        if not probe.has_structure:
+            return _result('bad_format', WARNING_BAD_FORMAT, **headers)
+
+        return _result('valid', '', canvas=probe.canvas, **headers)
+
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and cached:
+            revalidated = dict(cached)
+            revalidated['not_modified'] = True
+            return revalidated
+        warning, warning_short = HTTP_WARNINGS.get(e.code, (
+            f"the IIIF manifest URL you specified in your configuration CSV or Google Sheet could not be accessed (error {e.code})",
+            f"Error {e.code}: could not be accessed"
+        ))
+        return _result('http_error', warning, warning_short, detail=e.code)
+    except urllib.error.URLError as e:
+        return _result('unreachable', WARNING_UNREACHABLE,
+                       "Network error: could not be reached", detail=e.reason)
+    except Exception as e:
+        return _result('error', WARNING_UNVALIDATED,
+                       "Validation error: could not be validated", detail=str(e))
+
+def _result(status, warning, warning_short=None, detail=None, content_type=None, etag=None, last_modified=None, canvas=None):
+    """Build a validation result dict"""
+    return {
+        'status': status,
+        'warning': warning,
+        'warning_short': warning_short,
+        'detail': detail,
+        'content_type': content_type,
+        'etag': etag,
+        'last_modified': last_modified,
+        'canvas': canvas,
+        'not_modified': False
+    }
+
+class ManifestProbe:
+    """
+    Incremental JSON reader for IIIF manifests
+
+    Bytes are fed in as they arrive from the network and tokenized without
+    building the document. The probe records the top-level keys and the
+    first canvas's dimensions and image service id, and reports itself
+    satisfied as soon as both are known, so the rest of a multi-megabyte
+    manifest never has to be downloaded or held in memory.
+
+    Malformed JSON raises ValueError from feed() or finish().
+    """
+
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+    NUMBER_CHARS = re.compile(r'[-+0-9.eE]+')
+    NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+    LITERALS = {'true': True, 'false': False, 'null': None}
+
+    # Where the first canvas lives (Presentation 3 and 2)
+    CANVAS_PATHS = [('items', 0), ('sequences', 0, 'canvases', 0)]
+    # Key names leading to the image service id, relative to the canvas
+    SERVICE_PATHS = [
+        ('items', 'items', 'body', 'service'),  # Presentation 3
+        ('images', 'resource', 'service')       # Presentation 2
+    ]
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        # Characters of an unterminated string already searched for its closing quote
+        self.string_scanned = 0
+        # One frame per open container: [kind, current key/index, state]
+        self.stack = []
+        self.root_done = False
+        self.top_level_keys = set()
+        self.canvas = {'width': None, 'height': None, 'service': None}
+        self.canvas_closed = False
+
+    @property
+    def has_structure(self):
+        """Whether the top-level object has @context, type or @type"""
+        return bool(self.top_level_keys & {'@context', 'type', '@type'})
+
+    @property
+    def satisfied(self):
+        """Whether everything the validator needs has been read"""
+        if self.root_done:
+            return True
+        canvas_known = all(value is not None for value in self.canvas.values())
+        return self.has_structure and (canvas_known or self.canvas_closed)
+
+    def feed(self, chunk):
+        """Consume the next chunk of bytes"""
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        self._parse(final=False)
+
+    def finish(self):
+        """Signal end of input; raises ValueError if the document is incomplete"""
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(b'', final=True)
+        self.pos = 0
+        self._parse(final=True)
+        if not self.root_done:
+            raise ValueError('Unexpected end of JSON document')
+
+    def _parse(self, final):
+        while not self.satisfied:
+            token = self._next_token(final)
+            if token is None:
+                return
+            self._handle(*token)
+
+    def _next_token(self, final):
+        """Return (kind, value) for the next complete token, or None if more input is needed"""
+        self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+        if self.pos >= len(self.buffer):
+            return None
+
+        char = self.buffer[self.pos]
+        if char in '{}[],:':
+            self.pos += 1
+            return 'punct', char
+
+        if char == '"':
+            # Find the closing quote, resuming where the previous chunk's scan stopped
+            start = self.pos
+            end = self.buffer.find('"', start + max(1, self.string_scanned))
+            while end != -1:
+                backslashes = 0
+                while self.buffer[end - 1 - backslashes] == '\\':
+                    backslashes += 1
+                if backslashes % 2 == 0:
+                    break
+                end = self.buffer.find('"', end + 1)
+            if end == -1:
+                if final:
+                    raise ValueError('Unterminated string')
+                self.string_scanned = len(self.buffer) - start
+                return None
+            self.string_scanned = 0
+            self.pos = end + 1
+            return 'value', json.loads(self.buffer[start:self.pos])
+
+        match = self.NUMBER_CHARS.match(self.buffer, self.pos)
+        if match:
+            # A number touching the end of the buffer may continue in the next chunk
+            if match.end() == len(self.buffer) and not final:
+                return None
+            number = match.group()
+            if not self.NUMBER.fullmatch(number):
+                raise ValueError(f'Invalid number {number!r} in JSON')
+            self.pos = match.end()
+            return 'value', float(number) if any(c in number for c in '.eE') else int(number)
+
+        for literal, value in self.LITERALS.items():
+            if self.buffer.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return 'value', value
+            if not final and literal.startswith(self.buffer[self.pos:]):
+                return None
+
+        raise ValueError(f'Unexpected character {char!r} in JSON')
+
+    def _handle(self, kind, token):
+        if self.root_done:
+            raise ValueError('Extra data after JSON document')
+
+        frame = self.stack[-1] if self.stack else None
+
+        if kind == 'punct' and token in ',:}]':
+            if frame is None:
+                raise ValueError(f'Unexpected {token!r} in JSON')
+            self._handle_punct(frame, token)
+            return
+
+        # A value or the start of a container
+        if frame is None:
+            pass
+        elif frame[0] == 'object':
+            if frame[2] == 'key' and kind == 'value' and isinstance(token, str):
+                frame[1] = token
+                frame[2] = 'colon'
+                if len(self.stack) == 1:
+                    self.top_level_keys.add(token)
+                return
+            if frame[2] != 'value':
+                raise ValueError('Expected object key in JSON')
+            frame[2] = 'comma'
+        else:
+            if frame[2] != 'value':
+                raise ValueError('Expected comma in JSON array')
+            frame[2] = 'comma'
+
+        if kind == 'punct':
+            # '{' or '['
+            if token == '{':
+                self.stack.append(['object', None, 'key'])
+            else:
+                self.stack.append(['array', 0, 'value'])
+            return
+
+        self._record(tuple(f[1] for f in self.stack), token)
+        if frame is None:
+            self.root_done = True
+
+    def _handle_punct(self, frame, token):
+        kind, _, state = frame
+        if token == ':':
+            if kind != 'object' or state != 'colon':
+                raise ValueError("Unexpected ':' in JSON")
+            frame[2] = 'value'
+        elif token == ',':
+            if state != 'comma':
+                raise ValueError("Unexpected ',' in JSON")
+            if kind == 'object':
+                frame[2] = 'key'
+            else:
+                frame[1] += 1
+                frame[2] = 'value'
+        else:
+            expected = '}' if kind == 'object' else ']'
+            empty = (state == 'key' and frame[1] is None) or (kind == 'array' and state == 'value' and frame[1] == 0)
+            if token != expected or not (state == 'comma' or empty):
+                raise ValueError(f'Unexpected {token!r} in JSON')
+            self.stack.pop()
+            path = tuple(f[1] for f in self.stack)
+            if path in self.CANVAS_PATHS:
+                self.canvas_closed = True
+            if not self.stack:
+                self.root_done = True
+
+    def _record(self, path, value):
+        """Pick out first-canvas fields as scalar values go past"""
+        for canvas_path in self.CANVAS_PATHS:
+            if path[:len(canvas_path)] != canvas_path:
+                continue
+            relative = path[len(canvas_path):]
+            if relative in [('width',), ('height',)] and isinstance(value, int):
+                self.canvas[relative[0]] = value
+            elif relative and relative[-1] in ('id', '@id') and self.canvas['service'] is None:
+                # Only the first item at each level, e.g. items[0].items[0].body.service[0].id
+                indices = [part for part in relative if isinstance(part, int)]
+                names = tuple(part for part in relative[:-1] if isinstance(part, str))
+                if names in self.SERVICE_PATHS and not any(indices) and isinstance(value, str):
+                    self.canvas['service'] = value
+
+class ManifestCache:
+    """
+    On-disk cache of manifest validation results, keyed by URL
+
+    Entries store the HTTP status outcome, content type, ETag/Last-Modified
+    and the derived warnings. Entries younger than the TTL are reused
+    without touching the network; older entries are revalidated with a
+    conditional request. Only outcomes derived from an actual manifest
+    response are cached - HTTP errors and network failures are retried on
+    the next build.
+
+    The cache file is plain JSON so it can be restored as a CI cache.
+    """
+
+    # Outcomes worth remembering (the server answered with a document)
+    CACHEABLE_STATUSES = {'valid', 'not_json', 'bad_format', 'invalid_json'}
+
+    def __init__(self, path, ttl_hours=DEFAULT_CACHE_TTL_HOURS):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_hours * 3600
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+
+    @classmethod
+    def load(cls, path, ttl_hours=DEFAULT_CACHE_TTL_HOURS):
+        """Load the cache from disk (a missing or corrupt file gives an empty cache)"""
+        cache = cls(path, ttl_hours)
+        if cache.path.exists():
+            try:
+                with open(cache.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    cache.entries = data.get('entries', {})
+            except (OSError, ValueError) as e:
+                print(f"  [WARN] Ignoring unreadable manifest cache {cache.path}: {e}")
+        return cache
+
+    def save(self):
+        """Write the cache to disk"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with self.lock:
+            data = {'version': CACHE_VERSION, 'entries': self.entries}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True, default=str)
+        os.replace(tmp_path, self.path)
+
+    def get(self, url):
+        """Return the cache entry for a URL (fresh or expired), or None"""
+        with self.lock:
+            return self.entries.get(url)
+
+    def is_fresh(self, url):
+        """Whether the URL has an entry younger than the TTL"""
+        entry = self.get(url)
+        return bool(entry) and time.time() - entry.get('checked_at', 0) < self.ttl_seconds
+
+    def store(self, url, result):
+        """Record a validation result, if its outcome is cacheable"""
+        if result['status'] not in self.CACHEABLE_STATUSES:
+            return
+        entry = {key: value for key, value in result.items() if key != 'not_modified'}
+        entry['checked_at'] = time.time()
+        with self.lock:
+            self.entries[url] = entry
+
+def describe_result(result, object_id, manifest_url):
+    """
+    Format the log line for a validation result
+
+    Returns:
+        (level, message) tuple, where level is 'INFO' or 'WARN'
+    """
+    status = result['status']
+    detail = result['detail']
+
+    if status == 'valid':
+        return 'INFO', f"Validated IIIF manifest for object {object_id}"
+    if status == 'invalid_url':
+        return 'WARN', f"Cleared invalid IIIF manifest for object {object_id}: not a valid URL"
+    if status == 'not_json':
+        return 'WARN', f"IIIF manifest for object {object_id} does not return JSON (Content-Type: {detail})"
+    if status == 'invalid_json':
+        return 'WARN', f"IIIF manifest for object {object_id} is not valid JSON"
+    if status == 'bad_format':
+        return 'WARN', f"IIIF manifest for object {object_id} missing required fields (@context or type)"
+    if status == 'http_error':
+        return 'WARN', f"IIIF manifest for object {object_id} returned HTTP {detail}: {manifest_url}"
+    if status == 'unreachable':
+        return 'WARN', f"IIIF manifest for object {object_id} could not be reached: {detail}"
+    return 'WARN', f"Error validating IIIF manifest for object {object_id}: {detail}"
+
+def validate_manifests(manifest_urls, max_workers=DEFAULT_MAX_WORKERS, per_host_limit=DEFAULT_PER_HOST_LIMIT, cache=None):
+    """
+    Validate many manifest URLs concurrently
+
+    Each distinct URL is requested once. At most max_workers requests are in
+    flight overall, and at most per_host_limit against any single host.
+
+    Args:
+        manifest_urls: Iterable of manifest URLs (duplicates are fine)
+        max_workers: Global number of worker threads
+        per_host_limit: Maximum concurrent requests per host
+        cache: Optional ManifestCache; fresh entries skip the network and
+               expired ones are revalidated conditionally
+
+    Returns:
+        dict mapping each URL to its validation result
+    """
+    unique_urls = list(dict.fromkeys(manifest_urls))
+    if not unique_urls:
+        return {}
+
+    results = {}
+    if cache is not None:
+        for url in unique_urls:
+            if cache.is_fresh(url):
+                results[url] = cache.get(url)
+                cache.hits += 1
+    pending = [url for url in unique_urls if url not in results]
+
+    ssl_context = create_ssl_context()
+    host_slots = {}
+    host_slots_lock = threading.Lock()
+
+    def host_slot(url):
+        host = urlparse(url).netloc.lower()
+        with host_slots_lock:
+            if host not in host_slots:
+                host_slots[host] = threading.BoundedSemaphore(max(1, per_host_limit))
+            return host_slots[host]
+
+    def worker(url):
+        cached = cache.get(url) if cache is not None else None
+        with host_slot(url):
+            result = validate_manifest(url, ssl_context, cached)
+        if cache is not None:
+            cache.store(url, result)
+        return result
+
+    # Interleave hosts so the first wave of workers isn't spent waiting
+    # on a single host's semaphore
+    by_host = {}
+    for url in pending:
+        by_host.setdefault(urlparse(url).netloc.lower(), []).append(url)
+    ordered = []
+    queues = list(by_host.values())
+    while queues:
+        ordered.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+
+    if ordered:
+        workers = max(1, min(max_workers, len(ordered)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {url: executor.submit(worker, url) for url in ordered}
+        # Counted here rather than in the workers, like the hits above
+        for url, future in futures.items():
+            results[url] = future.result()
+            if cache is not None and results[url].get('not_modified'):
+                cache.revalidated += 1
+
+    return {url: results[url] for url in unique_urls}
+
+def main():
+    """Validate manifest URLs given on the command line"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate IIIF manifest URLs')
+    parser.add_argument('urls', nargs='+', help='Manifest URLs to validate')
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f'Concurrent validation requests (default: {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST_LIMIT,
+                        help=f'Concurrent requests per host (default: {DEFAULT_PER_HOST_LIMIT})')
+    args = parser.parse_args()
+
+    results = validate_manifests(args.urls, args.workers, args.per_host)
+    failed = False
+    for url in args.urls:
+        level, message = describe_result(results[url], url, url)
+        print(f"[{level}] {message}")
+        failed = failed or level == 'WARN'
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Read very large TIFF images a horizontal band at a time
+
+Pillow decodes an image whole, so a 40,000 × 30,000 pixel map sheet needs
+3.6 GB before anything is done with it. TIFF files, however, store their
+pixels in independent strips or tiles. TiffBandReader reads only the
+strips (or tiles) covering the rows asked for, wraps them in a small
+in-memory TIFF with the same encoding and lets Pillow decode that, so
+memory use follows the band height instead of the image height.
+
+Other formats (JPEG, PNG) and TIFF layouts that can't be split this way
+(separate colour planes, rotated images, old-style JPEG compression) are
+not supported; band_reader() returns None for them and they have to be
+decoded whole.
+"""
+
+import io
+import struct
+
+# TIFF tags
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+COMPRESSION = 259
+STRIP_OFFSETS = 273
+ORIENTATION = 274
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+PLANAR_CONFIGURATION = 284
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+TILE_OFFSETS = 324
+TILE_BYTE_COUNTS = 325
+
+# Tags describing how the pixels are encoded, copied into every band
+ENCODING_TAGS = [
+    258,  # BitsPerSample
+    COMPRESSION,
+    262,  # PhotometricInterpretation
+    266,  # FillOrder
+    277,  # SamplesPerPixel
+    PLANAR_CONFIGURATION,
+    317,  # Predictor
+    320,  # ColorMap
+    338,  # ExtraSamples
+    339,  # SampleFormat
+    347,  # JPEGTables
+    529,  # YCbCrCoefficients
+    530,  # YCbCrSubSampling
+    531,  # YCbCrPositioning
+    532,  # ReferenceBlackWhite
+]
+
+# Old-style JPEG compression stores one JPEG stream for the whole image
+UNSPLITTABLE_COMPRESSIONS = {6}
+
+LONG = 4
+
+def band_reader(image_path):
+    """
+    Open an image for reading in bands, if its layout allows it
+
+    Returns:
+        TiffBandReader, or None if the image has to be decoded whole
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(image_path) as img:
+            if img.format != 'TIFF':
+                return None
+            tags = img.tag_v2
+            tagtypes = dict(tags.tagtype)
+            byte_order = tags.prefix
+            encoding = {tag: tags[tag] for tag in ENCODING_TAGS if tag in tags}
+            layout = {tag: tags.get(tag) for tag in (
+                IMAGE_WIDTH, IMAGE_LENGTH, ROWS_PER_STRIP, STRIP_OFFSETS, STRIP_BYTE_COUNTS,
+                TILE_WIDTH, TILE_LENGTH, TILE_OFFSETS, TILE_BYTE_COUNTS, ORIENTATION
+            )}
+    except Exception:
+        return None
+
+    if encoding.get(PLANAR_CONFIGURATION, 1) != 1 or encoding.get(COMPRESSION, 1) in UNSPLITTABLE_COMPRESSIONS:
+        return None
+    if layout[ORIENTATION] not in (None, 1):
+        return None
+    if layout[TILE_OFFSETS] is None and layout[STRIP_OFFSETS] is None:
+        return None
+    return TiffBandReader(image_path, byte_order, encoding, {tag: tagtypes.get(tag) for tag in encoding}, layout)
+
+class TiffBandReader:
+    """
+    Rows of a striped or tiled TIFF, decoded a band at a time
+
+    Attributes:
+        size: (width, height) of the image
+    """
+
+    def __init__(self, image_path, byte_order, encoding, encoding_types, layout):
+        self.image_path = image_path
+        self.byte_order = byte_order
+        self.encoding = encoding
+        self.encoding_types = encoding_types
+        self.size = (layout[IMAGE_WIDTH], layout[IMAGE_LENGTH])
+
+        width, height = self.size
+        self.tiled = layout[TILE_OFFSETS] is not None
+        if self.tiled:
+            self.block_width = layout[TILE_WIDTH]
+            self.block_rows = layout[TILE_LENGTH]
+            self.offsets = layout[TILE_OFFSETS]
+            self.byte_counts = layout[TILE_BYTE_COUNTS]
+        else:
+            self.block_width = width
+            self.block_rows = min(layout[ROWS_PER_STRIP] or height, height)
+            self.offsets = layout[STRIP_OFFSETS]
+            self.byte_counts = layout[STRIP_BYTE_COUNTS]
+        self.blocks_across = (width + self.block_width - 1) // self.block_width
+
+    def bands(self, rows):
+        """Yield the image as bands of the given number of rows, top to bottom"""
+        with open(self.image_path, 'rb') as f:
+            for top in range(0, self.size[1], rows):
+                yield self.read_rows(f, top, min(top + rows, self.size[1]))
+
+    def read_rows(self, f, top, bottom):
+        """
+        Decode rows top to bottom (exclusive) of the image
+
+        Args:
+            f: The image file, opened in binary mode
+
+        Returns:
+            PIL image of the full width and bottom - top rows
+        """
+        from PIL import Image
+
+        width, height = self.size
+        first = top // self.block_rows
+        last = (bottom - 1) // self.block_rows
+        start = first * self.block_rows
+        rows = min((last + 1) * self.block_rows, height) - start
+
+        blocks = range(first * self.blocks_across, (last + 1) * self.blocks_across)
+        data = []
+        for index in blocks:
+            f.seek(self.offsets[index])
+            data.append(f.read(self.byte_counts[index]))
+
+        band = Image.open(io.BytesIO(self.wrap(rows, data)))
+        band.load()
+        if start == top and rows == bottom - top:
+            return band
+        return band.crop((0, top - start, width, bottom - start))
+
+    def wrap(self, rows, data):
+        """
+        Build a TIFF file holding the given strips or tiles
+
+        Args:
+            rows: Height of the band the blocks cover
+            data: Encoded bytes of each block, in file order
+
+        Returns:
+            bytes of a little TIFF image of the full width and the given rows
+        """
+        from PIL import TiffImagePlugin
+
+        ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=self.byte_order)
+        for tag, value in self.encoding.items():
+            if self.encoding_types.get(tag) is not None:
+                ifd.tagtype[tag] = self.encoding_types[tag]
+            ifd[tag] = value
+        for tag in (IMAGE_WIDTH, IMAGE_LENGTH):
+            ifd.tagtype[tag] = LONG
+        ifd[IMAGE_WIDTH] = self.size[0]
+        ifd[IMAGE_LENGTH] = rows
+
+        if self.tiled:
+            offsets_tag, counts_tag = TILE_OFFSETS, TILE_BYTE_COUNTS
+            ifd[TILE_WIDTH] = self.block_width
+            ifd[TILE_LENGTH] = self.block_rows
+        else:
+            offsets_tag, counts_tag = STRIP_OFFSETS, STRIP_BYTE_COUNTS
+            ifd.tagtype[ROWS_PER_STRIP] = LONG
+            ifd[ROWS_PER_STRIP] = self.block_rows
+        ifd.tagtype[offsets_tag] = LONG
+        ifd.tagtype[counts_tag] = LONG
+        ifd[counts_tag] = tuple(len(block) for block in data)
+
+        # Pillow writes strip offsets relative to the end of the directory
+        # (as its own TIFF writer expects); tile offsets are absolute. The
+        # directory's length doesn't depend on the offsets' values, so it
+        # is written once to find where the pixel data will start
+        header_length = 8
+        data_start = 0
+        if self.tiled:
+            ifd[offsets_tag] = (0,) * len(data)
+            data_start = header_length + len(ifd.tobytes(header_length))
+        offsets = []
+        position = data_start
+        for block in data:
+            offsets.append(position)
+            position += len(block)
+        ifd[offsets_tag] = tuple(offsets)
+
+        endian = '<' if self.byte_order == b'II' else '>'
+        header = self.byte_order + struct.pack(endian + 'HI', 42, header_length)
+        return header + ifd.tobytes(header_length) + b''.join(data)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Index of local object images in components/images/objects/
+
+The directory is scanned once and object IDs are resolved in memory, so
+validating thousands of objects or story steps costs one directory
+listing instead of a stat() call per row and extension.
+
+Used by csv_to_json.py (object and story validation) and generate_iiif.py
+(finding images to tile).
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+DEFAULT_IMAGES_DIR = 'components/images/objects'
+
+# Local object image extensions, in order of preference
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.tif', '.tiff']
+
+class ObjectImageIndex:
+    """
+    Map object IDs to image files in a directory
+
+    Matching ignores case in both the object ID and the extension. When an
+    object has several images, the extension listed first wins (e.g. .jpg
+    over .png); among files with the same extension, one whose name matches
+    the object ID's case exactly wins.
+    """
+
+    def __init__(self, images_dir=DEFAULT_IMAGES_DIR, extensions=IMAGE_EXTENSIONS):
+        self.images_dir = Path(images_dir)
+        self.extensions = [ext.lower() for ext in extensions]
+        # lowercased object ID -> {lowercased extension: [file names]}
+        self._files = {}
+
+        try:
+            entries = sorted(os.scandir(self.images_dir), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            entries = []
+
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() not in self.extensions or not entry.is_file():
+                continue
+            by_ext = self._files.setdefault(stem.lower(), {})
+            by_ext.setdefault(ext.lower(), []).append(entry.name)
+
+    def find(self, object_id):
+        """
+        Return the Path of the image for an object ID, or None
+
+        Args:
+            object_id: Object identifier (file name without extension)
+        """
+        object_id = str(object_id)
+        by_ext = self._files.get(object_id.lower())
+        if not by_ext:
+            return None
+
+        for ext in self.extensions:
+            names = by_ext.get(ext)
+            if names:
+                exact = [name for name in names if os.path.splitext(name)[0] == object_id]
+                return self.images_dir / (exact or names)[0]
+        return None
+
+    def fingerprint(self):
+        """
+        Return a hash of the indexed file names
+
+        It changes whenever an image is added, removed or renamed, which is
+        all that object and story validation depend on.
+        """
+        names = sorted(name for by_ext in self._files.values() for names in by_ext.values() for name in names)
+        return hashlib.sha256('\n'.join(names).encode('utf-8')).hexdigest()
+
+    def __contains__(self, object_id):
+        return self.find(object_id) is not None
+
+    def __len__(self):
+        return len(self._files)
+
+    def items(self, object_ids=()):
+        """
+        Yield (object_id, path) for every indexed object, sorted by object ID
+
+        Images are matched to object_ids the way find() matches them, and
+        yielded under those IDs with the path find() returns, so anything
+        named after the object (tiles, URLs) uses the same ID as
+        objects.json and the stories, whatever the file name's case. Images
+        no object ID matches keep the case of their file name.
+
+        Args:
+            object_ids: Known object IDs (objects.json and story steps)
+        """
+        known = {}
+        for object_id in object_ids:
+            object_id = str(object_id)
+            if object_id.lower() in self._files:
+                known.setdefault(object_id.lower(), set()).add(object_id)
+
+        for key in sorted(self._files):
+            if key in known:
+                for object_id in sorted(known[key]):
+                    yield object_id, self.find(object_id)
+                continue
+            by_ext = self._files[key]
+            for ext in self.extensions:
+                if ext in by_ext:
+                    name = by_ext[ext][0]
+                    yield os.path.splitext(name)[0], self.images_dir / name
+                    break
+
+_indexes = {}
+
+def get_image_index(images_dir=DEFAULT_IMAGES_DIR, extensions=IMAGE_EXTENSIONS):
+    """
+    Return a shared index for a directory, scanning it on first use
+
+    Repeated calls with the same arguments return the same index, so every
+    processor in a run shares one directory scan.
+    """
+    key = (str(Path(images_dir).resolve()), tuple(extensions))
+    if key not in _indexes:
+        _indexes[key] = ObjectImageIndex(images_dir, extensions)
+    return _indexes[key]
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Small fixed-size thumbnails for the objects index
+
+Without a thumbnail the objects index falls back to fetching info.json and
+a full-image size for local objects, and to loading the whole manifest in
+the browser for external ones. generate_iiif.py instead writes one small
+image per object:
+
+- local objects: scaled from the smallest full-image size the tiler wrote
+  (full/{sw},/0/default.jpg) that still covers the thumbnail, so the source
+  image is never decoded again;
+- objects with an external IIIF manifest: the manifest's thumbnail (or its
+  first image through its image service) is downloaded once.
+
+Finished thumbnails are cached in .telar-cache/thumbnails/, keyed by the
+source image's SHA-256 (or the manifest URL) and the thumbnail settings,
+so later builds only copy them.
+"""
+
+import io
+import json
+import os
+import tempfile
+import urllib.request
+from pathlib import Path
+
+from build_state import hash_bytes
+from iiif_tiler import normalize_mode, TILE_FORMATS
+from iiif_validator import USER_AGENT, create_ssl_context
+
+# Thumbnails fit in a square of this many pixels (as the index's
+# full/!400,400 requests for IIIF image services)
+THUMBNAIL_SIZE = 400
+THUMBNAIL_QUALITY = 80
+
+DEFAULT_CACHE_DIR = '.telar-cache/thumbnails'
+
+# URL path the thumbnail directory is served at
+THUMBNAIL_URL_PATH = '/iiif/thumbnails'
+
+# External images larger than this aren't downloaded
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+
+def thumbnail_settings(thumbnail_format='jpg'):
+    """Everything besides the source that a thumbnail depends on"""
+    return {'size': THUMBNAIL_SIZE, 'quality': THUMBNAIL_QUALITY, 'format': thumbnail_format}
+
+def fit_thumbnail(image, size=THUMBNAIL_SIZE):
+    """
+    Scale an image to fit a size × size square, never enlarging it
+
+    Returns:
+        New image in L or RGB mode (transparency flattened onto white)
+    """
+    from PIL import Image
+
+    image = normalize_mode(image)
+    scale = min(size / image.width, size / image.height, 1)
+    target = (max(round(image.width * scale), 1), max(round(image.height * scale), 1))
+    return image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+def open_scaled(path, size=THUMBNAIL_SIZE):
+    """Open an image for thumbnailing, letting JPEG decode at a reduced scale"""
+    from PIL import Image
+
+    image = Image.open(path)
+    image.draft('RGB', (size, size))
+    image.load()
+    return image
+
+def thumbnail_from_tiles(object_output, object_id, size=THUMBNAIL_SIZE):
+    """
+    Make a local object's thumbnail from its generated files
+
+    Uses the smallest full-image size listed in info.json that covers the
+    thumbnail, falling back to the base image ({object_id}.jpg) when no
+    listed size does (e.g. output from before larger sizes were written).
+
+    Returns:
+        PIL image fitting a size × size square
+    """
+    object_output = Path(object_output)
+    with open(object_output / 'info.json', 'r') as f:
+        info = json.load(f)
+
+    sizes = sorted(info.get('sizes', []), key=lambda entry: entry['width'])
+    source = object_output / f"{object_id}.jpg"
+    for entry in sizes:
+        covers = entry['width'] >= size or entry['height'] >= size
+        if covers or (entry['width'], entry['height']) == (info['width'], info['height']):
+            source = object_output / 'full' / f"{entry['width']}," / '0' / 'default.jpg'
+            break
+
+    with open_scaled(source, size) as image:
+        return fit_thumbnail(image, size)
+
+def first_id(value):
+    """The id of a IIIF resource given as a string, dict or list of either"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        return value.get('id') or value.get('@id')
+    return value if isinstance(value, str) else None
+
+def manifest_thumbnail_url(manifest, size=THUMBNAIL_SIZE):
+    """
+    URL of a small image for a IIIF manifest (Presentation API 2 or 3)
+
+    The manifest's own thumbnail is preferred, then its first canvas's
+    thumbnail, then a scaled request to the first image's service.
+
+    Returns:
+        URL, or None if the manifest doesn't point to any image
+    """
+    if first_id(manifest.get('thumbnail')):
+        return first_id(manifest['thumbnail'])
+
+    # Presentation 3: items > canvas > annotation page > annotation > body
+    canvases = manifest.get('items') or []
+    # Presentation 2: sequences > canvases > images > resource
+    if not canvases and manifest.get('sequences'):
+        canvases = manifest['sequences'][0].get('canvases') or []
+    if not canvases:
+        return None
+
+    canvas = canvases[0]
+    if first_id(canvas.get('thumbnail')):
+        return first_id(canvas['thumbnail'])
+
+    try:
+        if 'items' in canvas:
+            body = canvas['items'][0]['items'][0]['body']
+        else:
+            body = canvas['images'][0]['resource']
+    except (KeyError, IndexError, TypeError):
+        return None
+    if isinstance(body, list):
+        body = body[0] if body else {}
+
+    service = first_id(body.get('service'))
+    if service:
+        return f"{service.rstrip('/')}/full/!{size},{size}/0/default.jpg"
+    return first_id(body)
+
+def download(url, limit=MAX_DOWNLOAD_BYTES):
+    """GET a URL and return its body, refusing bodies over limit bytes"""
+    request = urllib.request.Request(url)
+    request.add_header('User-Agent', USER_AGENT)
+    with urllib.request.urlopen(request, timeout=10, context=create_ssl_context()) as response:
+        data = response.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f"{url} is larger than {limit // (1024 * 1024)} MB")
+    return data
+
+def fetch_external_thumbnail(manifest_url, size=THUMBNAIL_SIZE):
+    """
+    Download a thumbnail for an object with an external IIIF manifest
+
+    An image service's info.json (which objects.csv also accepts) is asked
+    for a scaled full image directly.
+
+    Returns:
+        PIL image fitting a size × size square
+
+    Raises:
+        Exception if the manifest or image can't be fetched or read
+    """
+    from PIL import Image
+
+    if manifest_url.rstrip('/').endswith('info.json'):
+        image_url = f"{manifest_url.rstrip('/')[:-len('info.json')]}full/!{size},{size}/0/default.jpg"
+    else:
+        image_url = manifest_thumbnail_url(json.loads(download(manifest_url)), size)
+        if not image_url:
+            raise ValueError("the manifest doesn't reference any image")
+
+    with Image.open(io.BytesIO(download(image_url))) as image:
+        image.draft('RGB', (size, size))
+        return fit_thumbnail(image, size)
+
+def save_thumbnail(image, path, thumbnail_format='jpg'):
+    """Encode a thumbnail, writing it atomically"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, TILE_FORMATS[thumbnail_format], quality=THUMBNAIL_QUALITY)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+class ThumbnailCache:
+    """Finished thumbnails by source and settings"""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(source, settings):
+        """
+        Cache key of a thumbnail
+
+        Args:
+            source: SHA-256 of a local source image, or an external manifest URL
+            settings: See thumbnail_settings()
+        """
+        return hash_bytes(json.dumps({'source': source, 'settings': settings}, sort_keys=True).encode('utf-8'))
+
+    def path(self, key, settings):
+        """File of a cache entry"""
+        return self.root / f"{key}.{settings['format']}"
+
+    def prune(self, keep):
+        """
+        Remove thumbnails whose key isn't in keep
+
+        Returns:
+            Number of thumbnails removed
+        """
+        removed = 0
+        if not self.root.exists():
+            return removed
+        for entry in self.root.iterdir():
+            if entry.is_file() and entry.name.split('.')[0] not in keep:
+                entry.unlink()
+                removed += 1
+        return removed
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store of generated IIIF tiles
+
+An object's tiles depend only on its source image and the tiling settings,
+not on where the site is published: the base URL only appears in the id of
+info.json and in manifest.json. The store keeps every object's tiles under
+a key made from the source's SHA-256 and those settings:
+
+    .telar-cache/iiif-tiles/{key[:2]}/{key}/
+        info.json                                (its id is rewritten on use)
+        base.jpg                                 (the {object_id}.jpg image)
+        {x},{y},{w},{h}/{sw},/0/default.jpg ...
+        full/...
+
+The store lives in .telar-cache/ so CI can restore it between runs. Object
+directories are materialised from it with hardlinks (copies across file
+systems); info.json and manifest.json are always written fresh, so nothing
+is ever written through a link into the store.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from build_state import hash_bytes
+
+DEFAULT_STORE_DIR = '.telar-cache/iiif-tiles'
+
+# Name of the base image inside a store entry
+BASE_IMAGE_NAME = 'base.jpg'
+
+def link_or_copy(source, destination):
+    """Hardlink a file, or copy it if the file system can't link it"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def link_tree(source_dir, destination_dir, rename=None, skip=()):
+    """
+    Recreate a directory tree with hardlinked files and copied symlinks
+
+    Args:
+        source_dir: Directory to link from
+        destination_dir: Directory to create (its parent must exist)
+        rename: dict of top-level file names to rename on the way
+        skip: Top-level file names to leave out
+    """
+    rename = rename or {}
+    source_dir = Path(source_dir)
+    destination_dir = Path(destination_dir)
+    destination_dir.mkdir(exist_ok=True)
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        relative = Path(dirpath).relative_to(source_dir)
+        top_level = relative == Path('.')
+        target_dir = destination_dir / relative
+        for name in dirnames + filenames:
+            source = Path(dirpath) / name
+            if top_level and name in skip:
+                continue
+            target = target_dir / (rename.get(name, name) if top_level else name)
+            if source.is_symlink():
+                os.symlink(os.readlink(source), target)
+            elif source.is_dir():
+                target.mkdir()
+            else:
+                link_or_copy(source, target)
+
+class TileStore:
+    """Tiles of every object ever generated, by source hash and settings"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(content_hash, settings):
+        """
+        Store key of a source image tiled with some settings
+
+        Args:
+            content_hash: SHA-256 of the source image
+            settings: JSON-serialisable dict of everything else the tiles
+                      depend on (not the base URL)
+        """
+        return hash_bytes(json.dumps({'source': content_hash, 'settings': settings}, sort_keys=True).encode('utf-8'))
+
+    def entry(self, key):
+        """Directory of a store entry"""
+        return self.root / key[:2] / key
+
+    def __contains__(self, key):
+        return (self.entry(key) / 'info.json').exists()
+
+    def add(self, key, object_dir, object_id, skip=()):
+        """
+        Store a freshly generated object directory
+
+        The entry is assembled in a temporary directory and renamed into
+        place, so a store entry is either complete or absent.
+
+        Args:
+            key: Store key (see key())
+            object_dir: The object's generated directory
+            object_id: Object identifier, to find the base image
+            skip: Top-level files not to store (manifest, build stamp)
+
+        Returns:
+            True if a new entry was added
+        """
+        entry = self.entry(key)
+        if key in self:
+            return False
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(dir=entry.parent, prefix=f'.{key[:8]}-'))
+        try:
+            link_tree(object_dir, temp_dir, rename={f"{object_id}.jpg": BASE_IMAGE_NAME},
+                      skip=set(skip) | {'info.json'})
+            # info.json is copied, not linked, since it is rewritten per base URL
+            shutil.copyfile(Path(object_dir) / 'info.json', temp_dir / 'info.json')
+            os.rename(temp_dir, entry)
+            return True
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return False
+
+    def materialise(self, key, object_dir, object_id):
+        """
+        Create an object directory from a store entry
+
+        Every file but info.json is hardlinked; the caller writes info.json
+        with its own base URL.
+
+        Returns:
+            The stored info.json document
+        """
+        entry = self.entry(key)
+        link_tree(entry, object_dir, rename={BASE_IMAGE_NAME: f"{object_id}.jpg"}, skip={'info.json'})
+        with open(entry / 'info.json', 'r') as f:
+            return json.load(f)
+
+    def prune(self, keep):
+        """
+        Remove entries whose key isn't in keep
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        if not self.root.exists():
+            return removed
+        for prefix_dir in self.root.iterdir():
+            if not prefix_dir.is_dir():
+                continue
+            for entry in prefix_dir.iterdir():
+                if entry.name not in keep:
+                    shutil.rmtree(entry, ignore_errors=True)
+                    removed += 1
+        return removed
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Per-story viewer plans
+
+Before it can draw an object, the story viewer has to resolve the object's
+manifest URL, fetch the manifest and only then fetch the image service's
+info.json: two or three requests in series per object. A viewer plan lists
+the objects a story shows, in step order, with what the viewer needs up
+front:
+
+    _data/story-1-viewer.json
+    {
+      "objects": [
+        {
+          "object_id": "img01",
+          "steps": [1, 4],
+          "manifest": "/iiif/objects/img01/manifest.json",
+          "service": "/iiif/objects/img01",
+          "width": 2048,
+          "height": 1367,
+          "tiles": [{"width": 512, "height": 512, "scaleFactors": [1, 2, 4]}]
+        },
+        ...
+      ]
+    }
+
+Local objects are described from their generated info.json, with paths
+relative to the site's baseurl that story.js resolves against the page's
+own location (as it does for objects without a plan), so previews, forks
+and custom domains load them from wherever the site is served. Objects with
+an external manifest use the first canvas csv_to_json.py recorded when it
+validated the manifest (the manifest cache); their tiles are only known
+once the viewer reads the service's info.json, so "tiles" is null.
+story.js opens manifests straight from the plan and prefetches the
+manifest and info.json of upcoming objects.
+"""
+
+import json
+from pathlib import Path
+
+from iiif_validator import ManifestCache, DEFAULT_CACHE_PATH
+
+# Appended to a story's data file name for its plan (story-1 -> story-1-viewer)
+VIEWER_PLAN_SUFFIX = '-viewer'
+
+# Appended to a story's data file name for the objects its steps show
+# (story-1 -> story-1-objects, written by csv_to_json.py)
+STORY_OBJECTS_SUFFIX = '-objects'
+
+def story_data_files(data_dir='_data'):
+    """Story and chapter step files (story-*.json, chapter-*.json), without the files derived from them"""
+    data_dir = Path(data_dir)
+    files = sorted(data_dir.glob('story-*.json')) + sorted(data_dir.glob('chapter-*.json'))
+    return [path for path in files if not path.stem.endswith((VIEWER_PLAN_SUFFIX, STORY_OBJECTS_SUFFIX))]
+
+def plan_path(story_json):
+    """Viewer plan file of a story data file"""
+    story_json = Path(story_json)
+    return story_json.with_name(f"{story_json.stem}{VIEWER_PLAN_SUFFIX}.json")
+
+def local_entry(object_id, output_path):
+    """
+    Plan entry of a locally tiled object, with site-relative URLs
+
+    Returns:
+        dict, or None if the object has no info.json
+    """
+    try:
+        with open(Path(output_path) / object_id / 'info.json', 'r') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return {
+        'manifest': f"/iiif/objects/{object_id}/manifest.json",
+        'service': f"/iiif/objects/{object_id}",
+        'width': info.get('width'),
+        'height': info.get('height'),
+        'tiles': info.get('tiles')
+    }
+
+def external_entry(manifest_url, cached):
+    """
+    Plan entry of an object with an external manifest
+
+    Args:
+        manifest_url: The object's iiif_manifest
+        cached: The manifest cache's entry for it, or None
+    """
+    cached = cached or {}
+    canvas = (cached.get('canvas') if cached.get('status') == 'valid' else None) or {}
+    return {
+        'manifest': manifest_url,
+        'service': canvas.get('service'),
+        'width': canvas.get('width'),
+        'height': canvas.get('height'),
+        'tiles': None
+    }
+
+def build_plan(steps, object_index, output_path, manifest_cache=None):
+    """
+    Viewer plan of one story
+
+    Args:
+        steps: The story's step records (its data file's contents)
+        object_index: objects.json records by object_id
+        output_path: Directory holding every object's tiles
+        manifest_cache: ManifestCache with external manifest results, if any
+
+    Returns:
+        Plan document; objects that can't be resolved are left out (the
+        viewer falls back to its own lookup)
+    """
+    step_numbers = {}
+    for step in steps:
+        object_id = str(step.get('object', '')).strip() if isinstance(step, dict) else ''
+        if object_id:
+            step_numbers.setdefault(object_id, []).append(step.get('step'))
+
+    objects = []
+    for object_id, numbers in step_numbers.items():
+        manifest_url = str(object_index.get(object_id, {}).get('iiif_manifest', '')).strip()
+        if manifest_url:
+            entry = external_entry(manifest_url, manifest_cache.get(manifest_url) if manifest_cache else None)
+        else:
+            entry = local_entry(object_id, output_path)
+        if entry:
+            objects.append({'object_id': object_id, 'steps': numbers, **entry})
+    return {'objects': objects}
+
+def write_viewer_plans(object_index, output_path, data_dir='_data', manifest_cache_path=DEFAULT_CACHE_PATH):
+    """
+    Write the viewer plan of every story next to its data file
+
+    Plans are only rewritten when their contents change.
+
+    Returns:
+        Number of plans written
+    """
+    manifest_cache = ManifestCache.load(manifest_cache_path) if Path(manifest_cache_path).exists() else None
+    story_files = story_data_files(data_dir)
+    written = 0
+    for story_json in story_files:
+        try:
+            with open(story_json, 'r', encoding='utf-8') as f:
+                steps = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not load {story_json}: {e}")
+            continue
+
+        plan = json.dumps(build_plan(steps, object_index, output_path, manifest_cache),
+                          indent=2, ensure_ascii=False)
+        path = plan_path(story_json)
+        if path.exists() and path.read_text(encoding='utf-8') == plan:
+            continue
+        path.write_text(plan, encoding='utf-8')
+        written += 1
+
+    # Plans of stories that no longer exist
+    stories = {story_json.stem for story_json in story_files}
+    for prefix in ('story-', 'chapter-'):
+        for path in Path(data_dir).glob(f'{prefix}*{VIEWER_PLAN_SUFFIX}.json'):
+            if path.stem[:-len(VIEWER_PLAN_SUFFIX)] not in stories:
+                path.unlink()
+    return written